@@ -1,19 +1,14 @@
 # app_streamlit.py — UI améliorée avec analytics et tableau de bord
-import yaml
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import sqlite3
-import json
+from datetime import datetime
+import os
+import tempfile
 from pathlib import Path
-from collections import Counter
 
-from src.loader import load_faq, load_json
-from src.ner import RegexNER
-from src.retriever import Retriever
-from src.templates import TemplateManager
+from src import engine
+from src.analytics import export_csv, get_dashboard_cache, get_sink, reset_db
+from src.pipeline import get_pipeline, pipeline_metrics
 
 st.set_page_config(page_title="UV-BF FAQ Chatbot", page_icon="🎓", layout="wide")
 
@@ -297,160 +292,107 @@ header[data-testid="stHeader"] {display: none;}
 """, unsafe_allow_html=True)
 
 # --------- Fonctions Analytics ----------
-def init_analytics_db():
-    """Initialise la base de données analytics"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS interactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            query TEXT,
-            response TEXT,
-            entities TEXT,
-            intent TEXT,
-            confidence_score REAL,
-            feedback TEXT,
-            session_id TEXT,
-            response_time REAL
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def log_interaction(query, response, entities, intent, confidence_score, response_time):
-    """Enregistre une interaction dans la base de données"""
-    conn = sqlite3.connect(DB_PATH)
-    session_id = st.session_state.get("session_id", f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
-    
-    conn.execute('''
-        INSERT INTO interactions (timestamp, query, response, entities, intent, confidence_score, session_id, response_time)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        datetime.now().isoformat(),
-        query,
-        response,
-        json.dumps(entities),
-        intent,
-        confidence_score,
-        session_id,
-        response_time
-    ))
-    conn.commit()
-    conn.close()
-
 def update_feedback(interaction_id, feedback_type):
     """Met à jour le feedback d'une interaction"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute('UPDATE interactions SET feedback = ? WHERE id = ?', (feedback_type, interaction_id))
-    conn.commit()
-    conn.close()
-
-def get_analytics_data():
-    """Récupère les données analytics de la base"""
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query('SELECT * FROM interactions ORDER BY timestamp DESC', conn)
-    conn.close()
-    return df
-
-def calculate_metrics(df):
-    """Calcule les métriques principales"""
-    if df.empty:
-        return {
-            "total_questions": 0,
-            "satisfaction_rate": 0,
-            "avg_response_time": 0,
-            "unique_sessions": 0
-        }
-    
-    total_questions = len(df)
-    
-    # Taux de satisfaction
-    feedback_df = df[df['feedback'].notna()]
-    satisfaction_rate = 0
-    if not feedback_df.empty:
-        likes = len(feedback_df[feedback_df['feedback'] == 'like'])
-        total_feedback = len(feedback_df)
-        satisfaction_rate = (likes / total_feedback) * 100 if total_feedback > 0 else 0
-    
-    # Temps de réponse moyen
-    avg_response_time = df['response_time'].mean() if 'response_time' in df.columns else 0
-    
-    # Sessions uniques
-    unique_sessions = df['session_id'].nunique()
-    
-    return {
-        "total_questions": total_questions,
-        "satisfaction_rate": satisfaction_rate,
-        "avg_response_time": avg_response_time,
-        "unique_sessions": unique_sessions
-    }
-
-# --------- Configuration et pipeline ----------
-init_analytics_db()
-
-with open(BASE_DIR / "config.yaml", "r", encoding="utf-8") as f:
-    cfg = yaml.safe_load(f)
-
-faq = load_faq(cfg["data"]["faq_csv"])
-ner_schema = load_json(cfg["data"]["ner_json"])
-templates = load_json(cfg["data"]["templates_json"])
+    analytics.update_feedback(interaction_id, feedback_type)
+
+def export_analytics(start, end, compress: bool) -> bytes:
+    """
+    Export CSV (éventuellement gzip) des interactions entre deux dates, écrit par lots dans un
+    fichier temporaire (src.analytics.export_csv : ni DataFrame ni chaîne CSV complète).
+    st.download_button exige le contenu entier : le fichier est relu en mémoire, qui croît donc
+    avec la taille de l'export (réduite par gzip). Sans limite de taille : GET /export de
+    src.server, envoyé par blocs.
+    """
+    fd, path = tempfile.mkstemp(suffix=".csv.gz" if compress else ".csv")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            export_csv(DB_PATH, f, start, end, compress)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.unlink(path)
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def dashboard_view(watermark, _data):
+    """
+    DataFrames et figures du tableau de bord, construits une fois par filigrane de la base
+    (`_data` : DashboardCache.get()) et partagés entre sessions et reruns.
+    """
+    # plotly n'est importé qu'à l'affichage du tableau de bord (démarrage plus rapide du chatbot)
+    import plotly.express as px
+
+    view = {"fig_entities": None, "fig_latency": None}
+    daily_stats = pd.DataFrame(_data["daily"], columns=['date', 'questions'])
+    view["fig_volume"] = px.line(
+        daily_stats, 
+        x='date', 
+        y='questions',
+        title="Questions par jour",
+        color_discrete_sequence=['#1FAA4B']
+    )
+    view["fig_volume"].update_layout(showlegend=False)
+
+    intent_counts = pd.DataFrame(_data["intents"], columns=['intent', 'questions'])
+    view["fig_intents"] = px.pie(
+        values=intent_counts['questions'], 
+        names=intent_counts['intent'],
+        title="Types de questions les plus fréquents"
+    )
+
+    entities_df = pd.DataFrame(_data["entities"], columns=['Entité', 'Fréquence'])
+    if not entities_df.empty:
+        view["fig_entities"] = px.bar(
+            entities_df, 
+            x='Fréquence', 
+            y='Entité',
+            orientation='h',
+            title="Top 10 des entités mentionnées",
+            color_discrete_sequence=['#1FAA4B']
+        )
 
-retr_cfg = cfg.get("retriever", {})
-nr = retr_cfg.get("ngram_range", (1,2))
-if isinstance(nr, list): nr = (int(nr[0]), int(nr[1]))
-top_k = int(retr_cfg.get("top_k", 3))
+    # Latence par étape (dernières interactions)
+    stages = {k: v for k, v in _data["latency"].items() if k != "total"}
+    if stages:
+        latency_df = pd.DataFrame([
+            {"Étape": stage, "Percentile": p, "ms": v[p]}
+            for stage, v in stages.items() for p in ("p50", "p95", "p99")
+        ])
+        view["fig_latency"] = px.bar(
+            latency_df,
+            x='Étape',
+            y='ms',
+            color='Percentile',
+            barmode='group',
+            title="Percentiles par étape (ms)",
+            color_discrete_sequence=['#1FAA4B', '#F4B400', '#DB4437']
+        )
 
-ner = RegexNER(ner_schema)
+    recent_df = pd.DataFrame(_data["recent"], columns=['timestamp', 'query', 'intent', 'confidence_score', 'feedback'])
+    recent_df['timestamp'] = pd.to_datetime(recent_df['timestamp']).dt.strftime('%d/%m/%Y %H:%M')
+    view["recent"] = recent_df.rename(columns={
+        'timestamp': 'Date/Heure',
+        'query': 'Question',
+        'intent': 'Intention',
+        'confidence_score': 'Confiance',
+        'feedback': 'Feedback'
+    })
+    return view
 
-retr = Retriever(
-    faq["index_text"],
-    faq,                       # ✅ on passe le DataFrame pour utiliser 'mots_cles'
-    ngram_range=nr,
-    min_df=retr_cfg.get("min_df", 1),
-    max_df=retr_cfg.get("max_df", 0.95),
-    keyword_weight=0.30,       # ajuste 0.2–0.4 selon tes tests
-    threshold=0.0              # optionnel
-)
+# --------- Configuration et pipeline ----------
+# Sink analytics partagé par processus (schéma créé à la première construction)
+analytics = get_sink(DB_PATH)
+# Agrégats du tableau de bord partagés par processus, relus seulement quand la base a changé
+dashboard = get_dashboard_cache(DB_PATH)
 
-tm = TemplateManager(templates)
+# Snapshot du pipeline partagé entre sessions/reruns ; rechargé en arrière-plan (après
+# validation) quand config.yaml ou un fichier de données change, sans redémarrage.
+pipe = get_pipeline(BASE_DIR)
 
 def answer(query: str) -> tuple:
     """Retourne la réponse et les métadonnées pour analytics (retrieval-first)"""
-    start_time = datetime.now()
-
-    # 1) Extraction d'entités (NER)
-    ents = ner.extract(query)
-
-    # 2) Recherche FAQ (retriever)
-    hits = retr.search(query, top_k=top_k)
-
-    if not hits:
-        response = "Désolé, je n'ai pas trouvé d'information pertinente."
-        intent_final = "info_generale_uvbf"   # catégorie par défaut si rien trouvé
-        confidence_score = 0.0
-    else:
-        # meilleur candidat
-        idx, score = hits[0]
-        row = faq.iloc[idx]
-
-        # Catégorie vraie issue du CSV (sera utilisée comme 'intent' pour l'analytics et les templates)
-        intent_final = str(row.get("categorie", "")).strip() or "info_generale_uvbf"
-        confidence_score = float(score)
-
-        # 3) Option templates : on tente un rendu avec la catégorie trouvée
-        #    Si pas de template ou info manquante -> on renvoie la réponse CSV
-        rendered = tm.render(intent_final, ents)
-        if rendered and (not rendered.get("need_more_info")) and rendered.get("text"):
-            response = rendered["text"]
-        else:
-            # Réponse brute de la FAQ (CSV simplifié)
-            response = f"**{row['question']}**\n\n{row['reponse']}"
-
-    # 4) Logging
-    response_time = (datetime.now() - start_time).total_seconds()
-    log_interaction(query, response, ents, intent_final, confidence_score, response_time)
-
-    return response, ents, intent_final, confidence_score
+    result = engine.answer(pipe, query, sink=analytics, session_id=st.session_state.get("session_id"))
+    return result["response"], result["entities"], result["intent"], result["confidence"], result["interaction_id"]
 
 
 def handle_feedback(interaction_id, feedback_type):
@@ -541,13 +483,7 @@ if page == "💬 Chatbot":
             submitted = st.form_submit_button("✨ Envoyer", use_container_width=True)
         
         if submitted and query.strip():
-            response, entities, intent, confidence = answer(query.strip())
-            
-            # Récupérer l'ID de la dernière interaction
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.execute('SELECT id FROM interactions ORDER BY id DESC LIMIT 1')
-            interaction_id = cursor.fetchone()[0]
-            conn.close()
+            response, entities, intent, confidence, interaction_id = answer(query.strip())
             
             st.session_state.history.append({
                 "role": "user", 
@@ -612,9 +548,9 @@ elif page == "📊 Tableau de bord":
     </div>
     """, unsafe_allow_html=True)
     
-    # Récupération des données
-    df = get_analytics_data()
-    metrics = calculate_metrics(df)
+    # Récupération des agrégats (en cache tant que le filigrane de la base ne change pas)
+    data = dashboard.get()
+    metrics = data["metrics"]
     
     # Métriques principales
     col1, col2, col3, col4 = st.columns(4)
@@ -639,6 +575,10 @@ elif page == "📊 Tableau de bord":
             f"{metrics['avg_response_time']:.2f}s",
             help="Temps moyen de traitement des questions"
         )
+        total_latency = data["latency"].get("total")
+        if total_latency:
+            st.caption(f"p50 {total_latency['p50']:.1f} ms · p95 {total_latency['p95']:.1f} ms · "
+                       f"p99 {total_latency['p99']:.1f} ms")
     
     with col4:
         st.metric(
@@ -647,7 +587,8 @@ elif page == "📊 Tableau de bord":
             help="Nombre de sessions utilisateurs distinctes"
         )
     
-    if not df.empty:
+    if metrics["total_questions"] > 0:
+        view = dashboard_view(data["watermark"], data)
         st.markdown("---")
         
         # Graphiques en deux colonnes
@@ -656,67 +597,25 @@ elif page == "📊 Tableau de bord":
         with col1:
             st.subheader("📈 Volume de questions")
             # Questions par jour
-            df['date'] = pd.to_datetime(df['timestamp']).dt.date
-            daily_stats = df.groupby('date').size().reset_index(name='questions')
-            
-            fig_volume = px.line(
-                daily_stats, 
-                x='date', 
-                y='questions',
-                title="Questions par jour",
-                color_discrete_sequence=['#1FAA4B']
-            )
-            fig_volume.update_layout(showlegend=False)
-            st.plotly_chart(fig_volume, use_container_width=True)
+            st.plotly_chart(view["fig_volume"], use_container_width=True)
         
         with col2:
             st.subheader("🎯 Distribution des intentions")
-            intent_counts = df['intent'].value_counts()
-            
-            fig_intents = px.pie(
-                values=intent_counts.values, 
-                names=intent_counts.index,
-                title="Types de questions les plus fréquents"
-            )
-            st.plotly_chart(fig_intents, use_container_width=True)
+            st.plotly_chart(view["fig_intents"], use_container_width=True)
         
         # Section entités
         st.subheader("🏷️ Entités les plus extraites")
-        all_entities = []
-        for entities_str in df['entities'].dropna():
-            try:
-                entities_dict = json.loads(entities_str)
-                for entity_type, values in entities_dict.items():
-                    all_entities.extend(values)
-            except:
-                continue
-        
-        if all_entities:
-            entity_counts = Counter(all_entities).most_common(10)
-            entities_df = pd.DataFrame(entity_counts, columns=['Entité', 'Fréquence'])
-            
-            fig_entities = px.bar(
-                entities_df, 
-                x='Fréquence', 
-                y='Entité',
-                orientation='h',
-                title="Top 10 des entités mentionnées",
-                color_discrete_sequence=['#1FAA4B']
-            )
-            st.plotly_chart(fig_entities, use_container_width=True)
+        if view["fig_entities"] is not None:
+            st.plotly_chart(view["fig_entities"], use_container_width=True)
         
+        # Latence par étape (dernières interactions)
+        if view["fig_latency"] is not None:
+            st.subheader("⏱️ Temps de réponse par étape")
+            st.plotly_chart(view["fig_latency"], use_container_width=True)
+
         # Tableau des dernières interactions
         st.subheader("💬 Dernières interactions")
-        recent_df = df.head(10)[['timestamp', 'query', 'intent', 'confidence_score', 'feedback']]
-        recent_df['timestamp'] = pd.to_datetime(recent_df['timestamp']).dt.strftime('%d/%m/%Y %H:%M')
-        recent_df = recent_df.rename(columns={
-            'timestamp': 'Date/Heure',
-            'query': 'Question',
-            'intent': 'Intention',
-            'confidence_score': 'Confiance',
-            'feedback': 'Feedback'
-        })
-        st.dataframe(recent_df, use_container_width=True)
+        st.dataframe(view["recent"], use_container_width=True)
         
         # Section export
         st.markdown("---")
@@ -724,22 +623,31 @@ elif page == "📊 Tableau de bord":
         col1, col2 = st.columns(2)
         
         with col1:
-            csv = df.to_csv(index=False)
-            st.download_button(
-                label="📄 Télécharger CSV",
-                data=csv,
-                file_name=f"analytics_uvbf_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
+            # L'historique n'est lu que sur demande, par lots, pour la période choisie
+            days = [d for d, _ in data["daily"]]
+            first_day = datetime.fromisoformat(days[0]).date() if days else datetime.now().date()
+            period = st.date_input("Période", value=(first_day, datetime.now().date()))
+            compress = st.checkbox("Compresser (gzip)", value=False)
+            if st.button("📄 Préparer l'export CSV"):
+                start, end = (period[0], period[-1]) if period else (None, None)  # une seule date : ce jour-là
+                analytics.flush()
+                suffix = ".csv.gz" if compress else ".csv"
+                st.download_button(
+                    label="📄 Télécharger CSV",
+                    data=export_analytics(start, end, compress),
+                    file_name=f"analytics_uvbf_{datetime.now().strftime('%Y%m%d')}{suffix}",
+                    mime="application/gzip" if compress else "text/csv"
+                )
         
         with col2:
             if st.button("🗑️ Réinitialiser les données"):
-                conn = sqlite3.connect(DB_PATH)
-                conn.execute('DELETE FROM interactions')
-                conn.commit()
-                conn.close()
+                analytics.flush()
+                reset_db(DB_PATH)
                 st.success("Données supprimées avec succès!")
                 st.rerun()
     
     else:
         st.info("🤖 Aucune donnée disponible. Utilisez d'abord le chatbot pour générer des analytics!")
+
+    with st.expander("⚙️ Chargement du pipeline"):
+        st.json(pipeline_metrics(pipe))
@@ -0,0 +1,63 @@
+# benchmarks/bench_answer_store.py — rendu de la réponse : faq.iloc[idx] (pandas) vs AnswerStore (tuples)
+#
+# Rejoue render_answer sur des indices tirés au hasard (sans templates, pour isoler l'accès
+# à la ligne), vérifie que les deux versions renvoient la même chose, puis mesure le temps
+# par appel et la mémoire du DataFrame vs celle de l'AnswerStore.
+# Lancer : python -m benchmarks.bench_answer_store [--docs 10 10000] [--calls 20000]
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.eval import scale_faq
+from src.engine import DEFAULT_INTENT
+from src.loader import AnswerStore, load_faq
+
+
+def _render_legacy(faq, idx: int) -> tuple:
+    """Version d'origine (src/engine.py) : une Series pandas par requête."""
+    row = faq.iloc[idx]
+    intent = str(row.get("categorie", "")).strip() or DEFAULT_INTENT
+    return f"**{row['question_canonique']}**\n\n{row['reponse']}", intent
+
+
+def _render_store(answers: AnswerStore, idx: int) -> tuple:
+    return answers.fallbacks[idx], answers.categories[idx] or DEFAULT_INTENT
+
+
+def _store_nbytes(answers: AnswerStore) -> int:
+    total = 0
+    for name in AnswerStore.__slots__:
+        col = getattr(answers, name)
+        total += sys.getsizeof(col) + sum(sys.getsizeof(v) for v in col)
+    return total
+
+
+def main():
+    ap = argparse.ArgumentParser(description="faq.iloc vs AnswerStore")
+    ap.add_argument("--faq", default="data/FAQ_UV-BF.csv")
+    ap.add_argument("--docs", type=int, nargs="+", default=[10, 10_000])
+    ap.add_argument("--calls", type=int, default=20_000)
+    args = ap.parse_args()
+
+    base = load_faq(args.faq)
+    print(f"{'n_docs':>8} {'iloc (µs)':>10} {'store (µs)':>11} {'gain':>7} {'DataFrame (Mo)':>15} {'store (Mo)':>11}")
+    for n in args.docs:
+        faq = scale_faq(base, n)
+        answers = AnswerStore.from_frame(faq)
+        idx = np.random.default_rng(0).integers(len(faq), size=args.calls).tolist()
+        t0 = time.perf_counter()
+        legacy = [_render_legacy(faq, i) for i in idx]
+        t_legacy = (time.perf_counter() - t0) * 1e6 / len(idx)
+        t0 = time.perf_counter()
+        store = [_render_store(answers, i) for i in idx]
+        t_store = (time.perf_counter() - t0) * 1e6 / len(idx)
+        if legacy != store:
+            raise SystemExit(f"réponses différentes pour n_docs={n}")
+        print(f"{len(faq):>8} {t_legacy:>10.2f} {t_store:>11.2f} {t_legacy / t_store:>6.0f}x "
+              f"{faq.memory_usage(deep=True).sum() / 2 ** 20:>15.2f} {_store_nbytes(answers) / 2 ** 20:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/bench_batch.py — Retriever.search en boucle vs Retriever.search_batch
+#
+# Corpus synthétique : questions de la FAQ recopiées avec un suffixe distinct jusqu'à
+# --docs documents ; requêtes : questions de la FAQ + variantes tronquées.
+# Vérifie que search_batch(qs) == [search(q) for q in qs], puis mesure.
+# Lancer : python -m benchmarks.bench_batch [--docs 5000] [--queries 256]
+import argparse
+import time
+
+import pandas as pd
+
+from src.loader import load_faq
+from src.retriever import Retriever
+
+
+def _corpus(faq: pd.DataFrame, n_docs: int) -> pd.DataFrame:
+    reps = -(-n_docs // len(faq))
+    df = pd.concat([faq] * reps, ignore_index=True).iloc[:n_docs].copy()
+    df["question_canonique"] = [f"{q} variante{i // len(faq)}" for i, q in enumerate(df["question_canonique"])]
+    df["index_text"] = df["question_canonique"] + " " + df["variantes"] + " " + df["reponse"]
+    return df
+
+
+def _queries(faq: pd.DataFrame, n: int):
+    base = [str(q) for q in faq["question_canonique"]]
+    base += [" ".join(q.split()[:3]) for q in base]
+    return [base[i % len(base)] for i in range(n)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="search en boucle vs search_batch")
+    ap.add_argument("--faq", default="data/FAQ_UV-BF.csv")
+    ap.add_argument("--docs", type=int, nargs="+", default=[500, 5_000, 20_000])
+    ap.add_argument("--queries", type=int, default=256)
+    ap.add_argument("--top-k", type=int, default=3)
+    args = ap.parse_args()
+
+    faq = load_faq(args.faq)
+    queries = _queries(faq, args.queries)
+    print(f"{'n_docs':>8} {'boucle (ms)':>12} {'lot (ms)':>10} {'gain':>8}")
+    for n in args.docs:
+        corpus = _corpus(faq, n)
+        retr = Retriever(corpus["index_text"], corpus)
+        t0 = time.perf_counter()
+        loop = [retr.search(q, top_k=args.top_k) for q in queries]
+        t_loop = (time.perf_counter() - t0) * 1000.0
+        t0 = time.perf_counter()
+        batch = retr.search_batch(queries, top_k=args.top_k)
+        t_batch = (time.perf_counter() - t0) * 1000.0
+        if loop != batch:
+            raise SystemExit(f"résultats différents pour n_docs={n}")
+        print(f"{n:>8} {t_loop:>12.1f} {t_batch:>10.1f} {t_loop / t_batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_candidates.py — score de toutes les lignes vs index inversé (candidats)
+#
+# Corpus synthétique : la FAQ + des documents de --words mots tirés d'un vocabulaire de
+# --vocab mots (loi de Zipf : quelques mots très fréquents, beaucoup de mots rares),
+# avec des mots-clés tirés de la même façon. Requêtes : 1 à 3 mots d'un document.
+# Vérifie que les deux chemins renvoient les mêmes résultats, puis mesure le temps par
+# requête : sur toutes les requêtes, et sur les seules requêtes sélectives (candidats sous
+# candidate_ratio x n_docs), les autres repassant par le score complet.
+# Lancer : python -m benchmarks.bench_candidates [--docs 10000 100000] [--ratio 0.1]
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.loader import load_faq
+from src.retriever import Retriever
+
+
+def _corpus(faq: pd.DataFrame, n_docs: int, n_vocab: int, n_words: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"mot{i}" for i in range(n_vocab)])
+    n_new = max(n_docs - len(faq), 0)
+    words = vocab[np.minimum(rng.zipf(1.3, size=(n_new, n_words)) - 1, n_vocab - 1)]
+    kws = vocab[np.minimum(rng.zipf(1.3, size=(n_new, 3)) - 1, n_vocab - 1)]
+    texts = [" ".join(w) for w in words]
+    rows = pd.DataFrame({"id": [f"syn{i}" for i in range(n_new)], "categorie": "synthetique",
+                         "question_canonique": texts, "reponse": texts, "index_text": texts,
+                         "mots_cles": [";".join(k) for k in kws]})
+    return pd.concat([faq, rows], ignore_index=True).fillna("")
+
+
+def _queries(faq: pd.DataFrame, corpus: pd.DataFrame, n: int, seed: int = 1) -> list:
+    rng = np.random.default_rng(seed)
+    out = [str(q) for q in faq["question_canonique"]]
+    texts = corpus["index_text"].tolist()
+    while len(out) < n:
+        words = texts[rng.integers(len(texts))].split()
+        out.append(" ".join(rng.choice(words, size=min(len(words), int(rng.integers(1, 4))), replace=False)))
+    return out[:n]
+
+
+def _per_query_ms(retr: Retriever, queries: list, top_k: int):
+    t0 = time.perf_counter()
+    hits = [retr.search(q, top_k=top_k) for q in queries]
+    return hits, (time.perf_counter() - t0) * 1000.0 / len(queries)
+
+
+def _selective(retr: Retriever, queries: list) -> list:
+    """Requêtes dont les candidats restent sous candidate_ratio (résolues par l'index inversé)."""
+    out = []
+    for q in queries:
+        q_vecs, q_kw = retr._query_vectors([q])
+        if retr._candidates(q_vecs, q_kw) is not None:
+            out.append(q)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="score complet vs index inversé")
+    ap.add_argument("--faq", default="data/FAQ_UV-BF.csv")
+    ap.add_argument("--docs", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--vocab", type=int, default=50_000)
+    ap.add_argument("--words", type=int, default=12)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--ratio", type=float, default=0.10, help="candidate_ratio testé")
+    ap.add_argument("--top-k", type=int, default=3)
+    args = ap.parse_args()
+
+    faq = load_faq(args.faq)
+    print(f"{'n_docs':>8} {'requêtes':>14} {'complet (ms/req)':>17} {'candidats (ms/req)':>19} {'gain':>7}")
+    for n in args.docs:
+        corpus = _corpus(faq, n, args.vocab, args.words)
+        queries = _queries(faq, corpus, args.queries)
+        full = Retriever(corpus["index_text"], corpus, candidate_ratio=0.0)
+        cand = Retriever.from_state(
+            full.vectorizer.vocabulary_, full.vectorizer.idf_, full.doc_term,
+            full._kw_vocab, full._kw_matrix, full._kw_len, candidate_ratio=args.ratio,
+        )
+        cand._inverted_index()  # construction des listes inversées hors mesure
+        selective = _selective(cand, queries)
+        for label, subset in ((f"toutes ({len(queries)})", queries), (f"sélectives ({len(selective)})", selective)):
+            if not subset:
+                continue
+            expected, t_full = _per_query_ms(full, subset, args.top_k)
+            got, t_cand = _per_query_ms(cand, subset, args.top_k)
+            if got != expected:
+                raise SystemExit(f"résultats différents pour n_docs={n}")
+            print(f"{n:>8} {label:>14} {t_full:>17.3f} {t_cand:>19.3f} {t_full / t_cand:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/bench_compact.py — mémoire de l'index standard vs compact / vocabulaire élagué
+#
+# Corpus : la FAQ + des documents synthétiques (loi de Zipf, cf. benchmarks.bench_candidates),
+# dont beaucoup de bigrammes vus une seule fois. Pour chaque configuration : nombre de
+# termes, mémoire de l'index par partie (Retriever.memory_usage), temps de construction,
+# qualité sur le jeu étiqueté de la FAQ (benchmarks.eval) et accord du top-1 avec l'index
+# standard.
+# Lancer : python -m benchmarks.bench_compact [--docs 20000 100000] [--max-features 50000]
+import argparse
+import time
+
+from benchmarks.bench_candidates import _corpus
+from benchmarks.eval import faq_queries, quality
+from src.loader import load_faq
+from src.retriever import Retriever
+
+_MB = 1024 * 1024
+
+
+def _configs(max_features: int) -> list:
+    return [
+        ("standard", {}),
+        ("compact", {"compact": True}),
+        ("compact + min_df=2", {"compact": True, "min_df": 2}),
+        (f"compact + max_features={max_features}", {"compact": True, "max_features": max_features}),
+    ]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="mémoire de l'index : standard vs compact / élagué")
+    ap.add_argument("--faq", default="data/FAQ_UV-BF.csv")
+    ap.add_argument("--docs", type=int, nargs="+", default=[20_000, 100_000])
+    ap.add_argument("--vocab", type=int, default=50_000)
+    ap.add_argument("--words", type=int, default=12)
+    ap.add_argument("--max-features", type=int, default=50_000)
+    ap.add_argument("--top-k", type=int, default=3)
+    args = ap.parse_args()
+
+    faq = load_faq(args.faq)
+    labeled = faq_queries(faq)
+    queries = [q for q, _ in labeled]
+    for n in args.docs:
+        corpus = _corpus(faq, n, args.vocab, args.words)
+        print(f"\n== {len(corpus)} documents, {len(queries)} requêtes étiquetées")
+        print(f"{'configuration':>34} {'termes':>9} {'vocab (Mo)':>11} {'matrices (Mo)':>14} {'total (Mo)':>11} "
+              f"{'index (s)':>10} {'recall@1':>9} {'mrr':>6} {'top-1 =':>8}")
+        reference = None
+        for label, cfg in _configs(args.max_features):
+            t0 = time.perf_counter()
+            retr = Retriever(corpus["index_text"], corpus, **cfg)
+            build_s = time.perf_counter() - t0
+            hits = retr.search_batch(queries, top_k=args.top_k)
+            top1 = [h[0][0] if h else None for h in hits]
+            reference = reference or top1
+            agree = sum(a == b for a, b in zip(top1, reference)) / len(top1)
+            qual = quality(hits, [lab for _, lab in labeled], corpus["categorie"], args.top_k)
+            mem = retr.memory_usage()
+            matrices = mem["doc_term"] + mem["idf"] + mem["keywords"]
+            print(f"{label:>34} {len(retr.vectorizer.vocabulary_):>9} {mem['vocabulary'] / _MB:>11.1f} "
+                  f"{matrices / _MB:>14.1f} {mem['total'] / _MB:>11.1f} {build_s:>10.1f} "
+                  f"{qual['recall@1']:>9.3f} {qual['mrr']:>6.3f} {agree:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_dashboard.py — tableau de bord : lectures complètes à chaque rerun vs DashboardCache
+#
+# Remplit une base analytics temporaire (interactions avec entités et temps par étape), puis
+# compare à chaque étape DashboardCache.get() aux lectures directes faites jusqu'ici à chaque
+# rerun de la page (read_metrics, read_latency...) : mêmes données. Étapes : base inchangée
+# (filigrane seul), nouvelles interactions (latences lues de façon incrémentale), feedback,
+# interaction d'id inférieur arrivée en retard (relecture complète), réinitialisation.
+# Lancer : python -m benchmarks.bench_dashboard [--rows 10000 100000] [--new 50]
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.analytics import (
+    _SQL, DashboardCache, connect, init_db, read_daily_questions, read_intent_counts, read_latency,
+    read_metrics, read_recent, read_top_entities, reset_db,
+)
+
+_INTENTS = ["inscription", "examens", "bibliotheque", "frais", "recuperation_compte"]
+_ENTITIES = ["licence", "master", "campus", "bobo", "ouaga", "L1", "L2"]
+
+
+def _reads_legacy(db_path) -> dict:
+    """Version d'origine (UNV_FAQ.get_dashboard_data) : toutes les lectures à chaque rerun."""
+    conn = connect(db_path)
+    try:
+        return {
+            "metrics": read_metrics(conn),
+            "latency": read_latency(conn),
+            "daily": read_daily_questions(conn),
+            "intents": read_intent_counts(conn),
+            "entities": read_top_entities(conn, 10),
+            "recent": read_recent(conn, 10),
+        }
+    finally:
+        conn.close()
+
+
+def _rows(rng, ids) -> list:
+    out = []
+    for i in ids:
+        day = 1 + int(i) % 28
+        ents = {"niveau": [_ENTITIES[int(rng.integers(len(_ENTITIES)))]]} if rng.random() < 0.5 else {}
+        stages = {s: round(float(rng.gamma(2.0, 0.5)), 3) for s in ("ner", "retrieval", "render")}
+        out.append((int(i), f"2026-09-{day:02d}T10:{int(i) % 60:02d}:{int(i) % 59:02d}.{int(i):06d}",
+                    f"question {i}", "réponse", json.dumps(ents), _INTENTS[int(i) % len(_INTENTS)],
+                    float(rng.random()), f"session_{int(i) % 500}", float(rng.gamma(2.0, 0.01)),
+                    json.dumps(stages)))
+    return out
+
+
+def _insert(db_path, rows):
+    with connect(db_path) as conn:
+        conn.executemany(_SQL["insert"], rows)
+    conn.close()
+
+
+def _timed(fn, repeat: int) -> tuple:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - t0) * 1000.0 / repeat, out
+
+
+def _check(label: str, cached: dict, db_path):
+    fresh = _reads_legacy(db_path)
+    if {k: cached[k] for k in fresh} != fresh:
+        raise SystemExit(f"{label} : données du cache différentes des lectures directes")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="lectures du tableau de bord : directes vs DashboardCache")
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--new", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'lignes':>8} {'étape':>22} {'direct (ms)':>12} {'cache (ms)':>11} {'gain':>8}")
+    for n in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "analytics.db"
+            init_db(db_path)
+            _insert(db_path, _rows(rng, range(1, n + 1)))
+            cache = DashboardCache(db_path)
+            t_cold, _ = _timed(cache.get, 1)
+            next_id = n + 1
+
+            def step(label, change=None):
+                if change is not None:
+                    change()
+                t_cache, cached = _timed(cache.get, 1) if change is not None else _timed(cache.get, args.repeat)
+                t_direct, _ = _timed(lambda: _reads_legacy(db_path), 1 if change is not None else args.repeat)
+                _check(label, cached, db_path)
+                print(f"{n:>8} {label:>22} {t_direct:>12.2f} {t_cache:>11.2f} {t_direct / t_cache:>7.1f}x")
+
+            print(f"{n:>8} {'1er affichage':>22} {'':>12} {t_cold:>11.2f}")
+            step("inchangée")
+
+            def add():
+                nonlocal next_id
+                _insert(db_path, _rows(rng, range(next_id, next_id + args.new)))
+                next_id += args.new
+            step(f"+{args.new} interactions", add)
+
+            def feedback():
+                with connect(db_path) as conn:
+                    conn.execute(_SQL["feedback"], ("like", next_id - 1))
+                conn.close()
+            step("feedback", feedback)
+            # ids réservés par blocs : un autre processus écrit plus loin, puis une ligne plus ancienne arrive
+            step("id d'un autre bloc", lambda: _insert(db_path, _rows(rng, [next_id + 1000])))
+            step("id en retard", lambda: _insert(db_path, _rows(rng, [next_id])))
+            step("réinitialisation", lambda: reset_db(db_path))
+            step("inchangée")
+            cache.close()
+            if cache.stats["incremental"] != 2:
+                raise SystemExit("les nouvelles interactions n'ont pas été lues de façon incrémentale")
+            print(f"{n:>8} {'compteurs':>22}   {cache.stats}")
+
+
+if __name__ == "__main__":
+    main()
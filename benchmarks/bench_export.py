@@ -0,0 +1,74 @@
+# benchmarks/bench_export.py — export CSV des interactions : pandas (to_csv en mémoire) vs flux par lots
+#
+# Remplit une base analytics temporaire (cf. benchmarks.bench_dashboard), puis compare
+# l'ancien export (read_sql_query de toute la table + to_csv en une chaîne) à
+# src.analytics.export_csv écrit dans un fichier : même CSV (gzip décompressé compris, et
+# avec un filtre de dates), temps et pic de mémoire Python (tracemalloc).
+# Lancer : python -m benchmarks.bench_export [--rows 10000 100000] [--batch 5000]
+import argparse
+import gzip
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_dashboard import _insert, _rows
+from src.analytics import export_csv, init_db
+
+
+def _export_legacy(db_path, start=None, end=None) -> str:
+    """Version d'origine (UNV_FAQ.get_analytics_data().to_csv), filtrée sur les dates si demandé."""
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query('SELECT * FROM interactions ORDER BY timestamp DESC', conn)
+    conn.close()
+    if start is not None:
+        day = df["timestamp"].str[:10]
+        df = df[(day >= start.isoformat()) & (day <= end.isoformat())]
+    return df.to_csv(index=False)
+
+
+def _measure(fn) -> tuple:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed * 1000.0, peak / 2 ** 20
+
+
+def main():
+    ap = argparse.ArgumentParser(description="export CSV : pandas vs flux par lots")
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--batch", type=int, default=5000)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'lignes':>8} {'export':>22} {'temps (ms)':>11} {'pic mém. (Mo)':>14} {'fichier (Mo)':>13}")
+    for n in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "analytics.db"
+            init_db(db_path)
+            _insert(db_path, _rows(rng, range(1, n + 1)))
+            cases = [("tout", None, None), ("du 05 au 11/09", date(2026, 9, 5), date(2026, 9, 11))]
+            for label, start, end in cases:
+                legacy, t, mem = _measure(lambda: _export_legacy(db_path, start, end))
+                print(f"{n:>8} {'pandas ' + label:>22} {t:>11.0f} {mem:>14.1f} {len(legacy.encode()) / 2 ** 20:>13.1f}")
+                for compress in (False, True):
+                    out = Path(tmp) / ("export.csv.gz" if compress else "export.csv")
+                    size, t, mem = _measure(lambda: export_csv(db_path, out, start, end, compress, args.batch))
+                    raw = out.read_bytes()
+                    text = (gzip.decompress(raw) if compress else raw).decode("utf-8")
+                    if text != legacy:
+                        raise SystemExit(f"export différent de to_csv ({label}, gzip={compress})")
+                    name = ("flux gzip " if compress else "flux ") + label
+                    print(f"{n:>8} {name:>22} {t:>11.0f} {mem:>14.1f} {size / 2 ** 20:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
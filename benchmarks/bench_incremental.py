@@ -0,0 +1,87 @@
+# benchmarks/bench_incremental.py — mise à jour incrémentale de l'index vs réapprentissage complet
+#
+# Sur un corpus synthétique (cf. benchmarks.eval.scale_faq), modifie / ajoute / supprime
+# quelques lignes par id, puis compare Retriever.apply_changes à un fit complet du corpus
+# modifié : durée, dérive d'IDF, et accord des top_k sur les questions de la FAQ.
+# Vérifie aussi qu'un terme élagué par le fit (max_df) n'est pas réintroduit par une mise à
+# jour avec la fréquence des seules lignes modifiées (IDF maximal au lieu d'être ignoré).
+# Lancer : python -m benchmarks.bench_incremental [--docs 10000 100000] [--edits 5]
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.eval import scale_faq
+from src.loader import load_faq
+from src.retriever import Retriever
+
+
+def _edit(faq: pd.DataFrame, n_edits: int):
+    """(upserts, deletes, corpus modifié) : n lignes modifiées, n ajoutées, n supprimées."""
+    new = faq.copy()
+    upserts = {}
+    for i in range(n_edits):
+        row = new.index[i * 7 + 1]
+        new.loc[row, "index_text"] = f"{new.loc[row, 'index_text']} mise a jour numero {i}"
+        upserts[new.loc[row, "id"]] = (new.loc[row, "index_text"], new.loc[row, "mots_cles"])
+    deletes = [new.loc[new.index[i * 7 + 4], "id"] for i in range(n_edits)]
+    new = new[~new["id"].isin(deletes)]
+    added = pd.DataFrame([{"id": f"new{i}", "categorie": "ajout", "question_canonique": f"question ajoutée {i}",
+                           "index_text": f"nouvelle ligne {i} frais inscription bibliotheque",
+                           "mots_cles": "frais;bibliotheque"} for i in range(n_edits)])
+    for _, row in added.iterrows():
+        upserts[row["id"]] = (row["index_text"], row["mots_cles"])
+    return upserts, deletes, pd.concat([new, added], ignore_index=True).fillna("")
+
+
+def _check_pruned():
+    """100 lignes contenant toutes « de » (max_df=0.95 l'élague) ; une mise à jour ne doit pas le rendre discriminant."""
+    docs = [f"de doc{i} sujet{i % 7}" for i in range(100)]
+    faq = pd.DataFrame({"id": range(100), "index_text": docs, "mots_cles": ""})
+    retr = Retriever(faq["index_text"], faq, max_df=0.95)
+    drift = retr.update(5, "de doc5 mise a jour")
+    faq.loc[5, "index_text"] = "de doc5 mise a jour"
+    full = Retriever(faq["index_text"], faq, max_df=0.95)
+    for q in ("de", "doc5 mise a jour"):
+        if retr.search(q, 3) != full.search(q, 3):
+            raise SystemExit(f"terme élagué réintroduit par la mise à jour : search({q!r}) différent du fit complet")
+    print(f"terme élagué (max_df) : ignoré par la mise à jour comme par le fit (dérive IDF {drift:.5f})\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Mise à jour incrémentale de l'index vs fit complet")
+    ap.add_argument("--faq", default="data/FAQ_UV-BF.csv")
+    ap.add_argument("--docs", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--edits", type=int, default=5)
+    ap.add_argument("--top-k", type=int, default=3)
+    args = ap.parse_args()
+
+    _check_pruned()
+    base = load_faq(args.faq)
+    queries = [str(q) for q in base["question_canonique"]] + ["frais inscription bibliotheque", "mise a jour"]
+    print(f"{'n_docs':>8} {'fit (ms)':>10} {'incr. (ms)':>11} {'gain':>8} {'dérive IDF':>11} {'top1 =':>7}")
+    for n in args.docs:
+        faq = scale_faq(base, n).reset_index(drop=True)
+        faq["id"] = [str(i) for i in range(len(faq))]
+        upserts, deletes, new = _edit(faq, args.edits)
+
+        retr = Retriever(faq["index_text"], faq)
+        retr.idf_drift()  # fréquences documentaires calculées hors mesure (faites une fois par index)
+        t0 = time.perf_counter()
+        drift = retr.apply_changes(upserts, deletes)
+        t_incr = (time.perf_counter() - t0) * 1000.0
+        if retr.ids != new["id"].tolist():
+            raise SystemExit("ordre des lignes différent du corpus modifié")
+
+        t0 = time.perf_counter()
+        full = Retriever(new["index_text"], new)
+        t_full = (time.perf_counter() - t0) * 1000.0
+
+        top1 = lambda r, q: [i for i, _ in r.search(q, args.top_k)[:1]]
+        agree = sum(top1(retr, q) == top1(full, q) for q in queries)
+        print(f"{n:>8} {t_full:>10.1f} {t_incr:>11.1f} {t_full / t_incr:>7.0f}x {drift:>11.5f} "
+              f"{agree:>3}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
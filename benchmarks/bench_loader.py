@@ -0,0 +1,68 @@
+# benchmarks/bench_loader.py — chargement des données : analyse du CSV / JSON vs snapshot (démarrage à chaud)
+#
+# Écrit la FAQ agrandie (benchmarks.eval.scale_faq) en CSV dans un répertoire temporaire,
+# puis mesure pour elle et pour les JSON de data/ : lecture + analyse à froid (sans cache),
+# premier chargement avec SnapshotCache (analyse + écriture du snapshot) et chargement à
+# chaud (snapshot relu). Vérifie que les trois donnent le même résultat.
+# Lancer : python -m benchmarks.bench_loader [--docs 10000 100000] [--repeat 3]
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.eval import scale_faq
+from src.loader import load_faq, load_json
+from src.snapshot import SnapshotCache
+
+_JSON = ("data/ner_uvbf.json", "data/templates_FAQ_uvbf.json", "data/normalisation_uvbf.json")
+
+
+def _best_ms(fn, repeat: int) -> tuple:
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0, out
+
+
+def _same(a, b) -> bool:
+    return a.equals(b) if hasattr(a, "equals") else a == b
+
+
+def main():
+    ap = argparse.ArgumentParser(description="analyse à froid vs snapshot")
+    ap.add_argument("--faq", default="data/FAQ_UV-BF.csv")
+    ap.add_argument("--docs", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    base = load_faq(args.faq)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        files = [(args.faq, load_faq)] + [(p, load_json) for p in _JSON]
+        for n in args.docs:
+            path = tmp / f"faq_{n}.csv"
+            scale_faq(base, n).drop(columns=["index_text"]).to_csv(path, index=False)
+            files.append((str(path), load_faq))
+
+        print(f"{'fichier':>30} {'Mo':>7} {'froid (ms)':>11} {'1er (ms)':>9} {'chaud (ms)':>11} {'gain':>7}")
+        for path, loader in files:
+            cache_dir = tmp / "cache" / Path(path).stem
+            cold_ms, cold = _best_ms(lambda: loader(path), args.repeat)
+            t0 = time.perf_counter()
+            first = loader(path, SnapshotCache(cache_dir))
+            first_ms = (time.perf_counter() - t0) * 1000.0
+            warm_cache = SnapshotCache(cache_dir)
+            warm_ms, warm = _best_ms(lambda: loader(path, warm_cache), args.repeat)
+            if warm_cache.report[str(Path(path))]["source"] != "snapshot":
+                raise SystemExit(f"{path} : snapshot non relu")
+            if not (_same(cold, first) and _same(cold, warm)):
+                raise SystemExit(f"{path} : résultat différent depuis le snapshot")
+            size = Path(path).stat().st_size / 2 ** 20
+            print(f"{Path(path).name:>30} {size:>7.2f} {cold_ms:>11.1f} {first_ms:>9.1f} {warm_ms:>11.1f} "
+                  f"{cold_ms / warm_ms:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_normalizer.py — normaliseur compilé vs implémentation historique
+#
+# Vérifie d'abord que la sortie est identique (données FAQ + corpus aléatoire), puis mesure.
+# Lancer : python -m benchmarks.bench_normalizer [--fuzz 20000]
+import argparse
+import csv
+import random
+import re
+import time
+import unicodedata
+
+from src.retriever import _normalize
+
+
+def _legacy_normalize(text: str) -> str:
+    """Référence : ancienne version de src.retriever._normalize (règles codées en dur)."""
+    if not isinstance(text, str):
+        return ""
+    t = text.lower()
+    t = ''.join(c for c in unicodedata.normalize('NFKD', t) if not unicodedata.combining(c))
+    rules = [
+        (r"\bexamens?\b", "examen"),
+        (r"\bevaluations?\b", "evaluation"),
+        (r"\bformations?\b", "formation"),
+        (r"\bprogrammes?\b", "programme"),
+        (r"\bfilieres?\b", "filiere"),
+        (r"\bsessions?\b", "session"),
+        (r"\bdiplomes?\b", "diplome"),
+        (r"\bnotes?\b", "note"),
+        (r"\bmodalites?\b", "modalite"),
+        (r"\bidentifiants?\b", "identifiant"),
+        (r"\bmasters?\b", "master"),
+        (r"\blicences?\b", "licence"),
+        (r"\bproblemes?\b", "probleme"),
+        (r"\bdifficultes?\b", "difficulte"),
+    ]
+    for pat, rep in rules:
+        t = re.sub(pat, rep, t)
+    t = re.sub(r"\buv[\-\s]?bf\b", "uvbf", t)
+    t = re.sub(r"\bmdp\b", "mot de passe", t)
+    t = re.sub(r"[_/]", " ", t)
+    t = re.sub(r"\s+", " ", t).strip()
+    return t
+
+
+_FUZZ_PIECES = [
+    "Examens", "évaluations", "FORMATION", "programmes", "Filières", "session", "diplômes", "notes",
+    "modalités", "identifiant", "Masters", "licences", "problème", "difficultés", "UV-BF", "uv bf",
+    "uv\tbf", "uvbf", "uv--bf", "MDP", "mdps", "note_s", "notes/", "xnotes", "examen2", "été", "ça",
+    "ﬁlière", "Ⅳ", "é", " ", " ", "\n", "\x1c", " ", " ", "_", "/", "-", "'", "’", "?",
+    "S2", "L1", "50 000 FCFA", "info@uv.bf", "ß", "İ", "ǅ", "",
+]
+
+
+def _fuzz_corpus(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield "".join(rng.choice(_FUZZ_PIECES) for _ in range(rng.randint(0, 12)))
+
+
+def _faq_corpus(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield from (v for v in row.values() if v)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Normaliseur compilé vs implémentation historique")
+    ap.add_argument("--faq", default="data/FAQ_UV-BF.csv")
+    ap.add_argument("--fuzz", type=int, default=20_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    corpus = list(_faq_corpus(args.faq)) + list(_fuzz_corpus(args.fuzz)) + [None, 123]
+    diffs = [t for t in corpus if _normalize(t) != _legacy_normalize(t)]
+    if diffs:
+        raise SystemExit(f"{len(diffs)} sorties différentes, ex: {diffs[0]!r}")
+    print(f"sorties identiques sur {len(corpus)} textes")
+
+    for name, fn in (("historique", _legacy_normalize), ("compilé", _normalize)):
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            for t in corpus:
+                fn(t)
+        dt = (time.perf_counter() - t0) / (args.repeat * len(corpus)) * 1e6
+        print(f"{name:>12} : {dt:.2f} µs/texte")
+
+
+if __name__ == "__main__":
+    main()
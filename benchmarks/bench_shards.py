@@ -0,0 +1,63 @@
+# benchmarks/bench_shards.py — Retriever.search_batch vs ShardedRetriever (1, 2, 4 ... processus)
+#
+# Corpus synthétique (variantes bruitées de la FAQ, cf. benchmarks.eval.scale_faq) de
+# --docs documents ; requêtes : questions + groupes de mots-clés de la FAQ.
+# Vérifie que chaque découpage renvoie exactement les résultats du Retriever, puis mesure
+# (premier lot hors mesure : démarrage du pool et copie en mémoire partagée).
+# Le gain dépend du nombre de cœurs disponibles (os.cpu_count()).
+# Lancer : python -m benchmarks.bench_shards [--docs 100000] [--queries 256] [--shards 1 2 4]
+import argparse
+import os
+import time
+
+from benchmarks.eval import faq_queries, scale_faq
+from src.loader import load_faq
+from src.retriever import Retriever
+from src.sharding import ShardedRetriever
+
+
+def _timed(fn, repeat: int):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best * 1000.0
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    default_shards = sorted({1, 2, 4, cpus} - {0})
+    ap = argparse.ArgumentParser(description="recherche sur un processus vs recherche répartie")
+    ap.add_argument("--faq", default="data/FAQ_UV-BF.csv")
+    ap.add_argument("--docs", type=int, default=100_000)
+    ap.add_argument("--queries", type=int, default=256)
+    ap.add_argument("--shards", type=int, nargs="+", default=default_shards)
+    ap.add_argument("--top-k", type=int, default=3)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    faq = scale_faq(load_faq(args.faq), args.docs)
+    base_queries = [q for q, _ in faq_queries(faq.iloc[:200])]
+    queries = [base_queries[i % len(base_queries)] for i in range(args.queries)]
+
+    t0 = time.perf_counter()
+    retr = Retriever(faq["index_text"], faq)
+    print(f"{len(faq)} documents, {len(queries)} requêtes, {cpus} cœur(s) ; index {time.perf_counter() - t0:.1f} s")
+
+    expected, t_ref = _timed(lambda: retr.search_batch(queries, top_k=args.top_k), args.repeat)
+    print(f"{'shards':>8} {'démarrage (ms)':>15} {'lot (ms)':>10} {'gain':>8}")
+    print(f"{'-':>8} {'-':>15} {t_ref:>10.1f} {1.0:>7.2f}x")
+    for n in args.shards:
+        with ShardedRetriever(retr, n) as sharded:
+            t0 = time.perf_counter()
+            first = sharded.search_batch(queries, top_k=args.top_k)
+            t_start = (time.perf_counter() - t0) * 1000.0
+            got, t_batch = _timed(lambda: sharded.search_batch(queries, top_k=args.top_k), args.repeat)
+        if first != expected or got != expected:
+            raise SystemExit(f"résultats différents avec {n} shards")
+        print(f"{n:>8} {t_start:>15.1f} {t_batch:>10.1f} {t_ref / t_batch:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
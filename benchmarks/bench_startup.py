@@ -0,0 +1,99 @@
+# benchmarks/bench_startup.py — démarrage d'un processus de service : imports (-X importtime) et mémoire
+#
+# 1) Vérifie que les vecteurs de requête de src.tfidf.QueryVectorizer (NumPy / SciPy seuls)
+#    sont identiques à ceux de TfidfVectorizer, en float64 et en float32 (index compact).
+# 2) Lance chaque scénario dans un processus neuf avec `python -X importtime` et mesure :
+#    durée totale, temps d'import (total et temps propres des modules de chaque bibliothèque
+#    lourde), pic de RSS, scikit-learn chargé ou non.
+#    Scénario « avant » : même chose en important aussi TfidfVectorizer, comme l'ancien
+#    src/retriever.py le faisait à chaque démarrage.
+# Lancer : python -m benchmarks.bench_startup [--repeat 3]
+import argparse
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.eval import faq_queries
+from src.loader import load_faq
+from src.pipeline import Pipeline
+from src.retriever import _fitted_vectorizer, _make_vectorizer
+
+_PACKAGES = ("numpy", "scipy", "pandas", "sklearn", "plotly")
+
+_PIPELINE = "from src.pipeline import Pipeline; Pipeline('.')"
+_SCENARIOS = [
+    ("serveur : import", "import src.server"),
+    ("serveur : pipeline (index persisté)", _PIPELINE),
+    ("avant : pipeline + sklearn", "import sklearn.feature_extraction.text; " + _PIPELINE),
+    ("tableau de bord : plotly.express", "import plotly.express"),
+]
+# VmHWM (pic de RSS depuis l'exec) plutôt que ru_maxrss, qui garde celui du processus parent (Linux)
+_REPORT = ("; import sys; print('@@', [l.split()[1] for l in open('/proc/self/status') if l.startswith('VmHWM')][0], "
+           "'sklearn' in sys.modules)")
+
+
+def _check_vectors(faq) -> None:
+    queries = [q for q, _ in faq_queries(faq)] + list(faq["index_text"])
+    for dtype in (np.float64, np.float32):
+        ref = _make_vectorizer((1, 2), 1, 0.95, None, dtype)
+        ref.fit(faq["index_text"])
+        a = ref.transform(queries)
+        b = _fitted_vectorizer((1, 2), 1, 0.95, ref.vocabulary_, ref.idf_).transform(queries)
+        same = all(np.array_equal(getattr(a, k), getattr(b, k)) for k in ("indptr", "indices", "data"))
+        if not same or a.data.dtype != b.data.dtype:
+            raise SystemExit(f"vecteurs de requête différents ({np.dtype(dtype).name})")
+    print(f"vecteurs de requête identiques à TfidfVectorizer ({len(queries)} textes, float64 et float32)")
+
+
+def _import_times(stderr: str) -> dict:
+    """Temps d'import (ms) : total, et par paquet de _PACKAGES (somme des temps propres de ses modules)."""
+    out = {"total": 0.0}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        out["total"] += int(own) / 1000.0
+        if package in _PACKAGES:
+            out[package] = out.get(package, 0.0) + int(own) / 1000.0
+    return out
+
+
+def _run(code: str) -> dict:
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code + _REPORT], capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1]}
+    marker = [line for line in proc.stdout.splitlines() if line.startswith("@@")][-1].split()
+    out = _import_times(proc.stderr)
+    out.update(wall=wall, rss=int(marker[1]) / 1024.0, sklearn_loaded=marker[2] == "True")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="imports et mémoire au démarrage d'un processus de service")
+    ap.add_argument("--faq", default="data/FAQ_UV-BF.csv")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    _check_vectors(load_faq(args.faq))
+    Pipeline(".")  # index persisté (data/index) et snapshots (data/cache) prêts
+
+    print(f"\n{'scénario':>36} {'durée (s)':>10} {'imports (ms)':>13} "
+          + " ".join(f"{p:>8}" for p in _PACKAGES) + f" {'RSS (Mo)':>9} {'sklearn':>8}")
+    for label, code in _SCENARIOS:
+        runs = [_run(code) for _ in range(args.repeat)]
+        if "error" in runs[0]:
+            print(f"{label:>36}   indisponible : {runs[0]['error']}")
+            continue
+        best = min(runs, key=lambda r: r["wall"])
+        cols = " ".join(f"{best[p]:>8.0f}" if p in best else f"{'-':>8}" for p in _PACKAGES)
+        print(f"{label:>36} {best['wall']:>10.2f} {best['total']:>13.0f} {cols} {best['rss']:>9.0f} "
+              f"{'oui' if best['sklearn_loaded'] else 'non':>8}")
+
+
+if __name__ == "__main__":
+    main()
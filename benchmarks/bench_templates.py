@@ -0,0 +1,99 @@
+# benchmarks/bench_templates.py — rendu pré-compilé vs TemplateManager.render historique
+#
+# Vérifie d'abord que le rendu est identique (texte, exceptions) pour chaque intention
+# de templates_FAQ_uvbf.json et de nombreuses combinaisons d'entités, puis mesure.
+# Lancer : python -m benchmarks.bench_templates [--repeat 2000]
+import argparse
+import itertools
+import time
+
+from src.loader import load_json
+from src.templates import ENTITY_KEYS, TemplateManager
+
+
+def _legacy_render(templates: dict, intent, entities):
+    """Référence : ancienne version de TemplateManager.render."""
+    t = templates.get(intent)
+    if not t:
+        return {"text": "", "need_more_info": False, "missing": []}
+    required = t.get("required_entities", [])
+    missing = [e for e in required if e not in entities]
+    if missing:
+        prompt = t.get("fallback_prompt") or ("Précisez: " + ", ".join(missing))
+        return {"text": prompt, "need_more_info": True, "missing": missing}
+
+    values = {}
+    values.update(t.get("defaults", {}))
+    for k in ["NIVEAU","SEMESTRE","MONTANT","MODE_PAIEMENT","CONTACT","SERVICE","TYPE_EXAMEN"]:
+        if k in entities and entities[k]:
+            values[k] = entities[k][0]
+
+    liens = t.get("default_links", [])
+    values["LIEN"] = liens[0] if liens else ""
+
+    text = t.get("template_text", "")
+    out = text.format(**{k: values.get(k, "") for k in values})
+
+    suffix = t.get("contact_suffix", "")
+    if suffix and (values.get("SERVICE") or values.get("CONTACT")):
+        out += suffix.format(**{k: values.get(k, "") for k in values})
+
+    return {"text": out, "need_more_info": False, "missing": []}
+
+
+def _call(fn, *args):
+    try:
+        return fn(*args)
+    except Exception as e:  # les erreurs (ex: KeyError sur un champ absent) doivent aussi être identiques
+        return (type(e), e.args)
+
+
+def _entity_cases():
+    """Sous-ensembles d'entités (valeur normale, vide, liste vide) + entités hors liste."""
+    keys = list(ENTITY_KEYS) + ["FILIERE"]
+    samples = {k: [f"{k.lower()}_val"] for k in keys}
+    yield {}
+    for r in (1, 2, 3, len(keys)):
+        for combo in itertools.combinations(keys, r):
+            yield {k: samples[k] for k in combo}
+    for k in keys:
+        yield {**samples, k: []}
+        yield {**samples, k: [""]}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rendu pré-compilé vs TemplateManager.render historique")
+    ap.add_argument("--templates", default="data/templates_FAQ_uvbf.json")
+    ap.add_argument("--repeat", type=int, default=2000)
+    args = ap.parse_args()
+
+    raw = load_json(args.templates)
+    tm = TemplateManager(raw)
+    intents = list(tm.templates) + ["intention_inconnue"]
+    cases = list(_entity_cases())
+
+    n = 0
+    for intent in intents:
+        for ents in cases:
+            a = _call(_legacy_render, tm.templates, intent, ents)
+            b = _call(tm.render, intent, ents)
+            if a != b:
+                raise SystemExit(f"rendu différent pour {intent} {ents}: {a!r} != {b!r}")
+            n += 1
+    print(f"rendus identiques sur {n} cas ({len(intents)} intentions)")
+
+    typical = {"NIVEAU": ["Licence"], "SEMESTRE": ["S2"], "MONTANT": ["50 000"], "MODE_PAIEMENT": ["Trésor public"]}
+    print(f"{'intention':>28} {'historique (µs)':>16} {'compilé (µs)':>14}")
+    for intent in intents:
+        timings = []
+        for fn in (lambda: _call(_legacy_render, tm.templates, intent, typical),
+                   lambda: _call(tm.render, intent, typical)):
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                fn()
+            timings.append((time.perf_counter() - t0) / args.repeat * 1e6)
+        print(f"{intent:>28} {timings[0]:>16.2f} {timings[1]:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# benchmarks/bench_topk.py — tri complet vs sélection partielle (argpartition) des top_k
+#
+# Lancer : python -m benchmarks.bench_topk [--top-k 3] [--repeat 50]
+import argparse
+import time
+
+import numpy as np
+
+from src.retriever import _select_top_k
+
+
+def _full_sort(scores: np.ndarray, top_k: int, threshold: float):
+    """Ancienne stratégie : liste complète de tuples triée puis tronquée."""
+    combined = [(i, float(s)) for i, s in enumerate(scores) if s >= threshold]
+    combined.sort(key=lambda x: x[1], reverse=True)
+    return combined[:top_k]
+
+
+def _timeit(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Tri complet vs sélection partielle des top_k")
+    ap.add_argument("--top-k", type=int, default=3)
+    ap.add_argument("--threshold", type=float, default=0.0)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'n_docs':>10} {'tri (ms)':>12} {'partiel (ms)':>14} {'gain':>8}")
+    for n in args.sizes:
+        # scores réalistes : majorité de zéros (aucun terme commun) + quelques ex-aequo
+        scores = np.round(rng.random(n) * (rng.random(n) < 0.05), 3)
+        assert _full_sort(scores, args.top_k, args.threshold) == _select_top_k(scores, args.top_k, args.threshold)
+        t_full = _timeit(lambda: _full_sort(scores, args.top_k, args.threshold), args.repeat)
+        t_part = _timeit(lambda: _select_top_k(scores, args.top_k, args.threshold), args.repeat)
+        print(f"{n:>10} {t_full:>12.3f} {t_part:>14.3f} {t_full / t_part:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
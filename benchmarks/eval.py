@@ -0,0 +1,249 @@
+# benchmarks/eval.py — évaluation hors ligne (qualité + latence) du pipeline de réponse
+#
+# Requêtes rejouées :
+#   --source faq           jeu étiqueté construit depuis la FAQ (question + groupes de mots_cles,
+#                          étiquette = categorie de la ligne)
+#   --source interactions  requêtes de la table interactions (étiquette = intention des réponses
+#                          notées « like », sinon latence seule)
+# Rapporte par configuration : p50/p95/p99 par étape (NER, recherche, rendu, journalisation),
+# débit, recall@1, recall@k et MRR (pertinent = même catégorie que l'étiquette).
+# --scale N ajoute des lignes synthétiques (variantes bruitées) jusqu'à N documents ;
+# --sweep balaie les paramètres du retriever (produit cartésien).
+# Lancer : python -m benchmarks.eval [--source faq] [--scale 10000 100000]
+#                                    [--sweep keyword_weight=0,0.3,0.5 ngram_range=1-1,1-2]
+import argparse
+import copy
+import itertools
+import json
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src import engine
+from src.analytics import AnalyticsSink
+from src.loader import AnswerStore, load_faq
+from src.pipeline import get_pipeline
+from src.retriever import Retriever, _keyword_list
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STAGES = ("ner", "retrieval", "render", "logging")
+PERCENTILES = (50, 95, 99)
+
+
+# ------------ Jeux de requêtes ------------
+def faq_queries(faq: pd.DataFrame, group: int = 3) -> list:
+    """[(requête, catégorie attendue)] : chaque question + ses mots-clés par groupes de `group`."""
+    out = []
+    for _, row in faq.iterrows():
+        label = str(row.get("categorie", "")).strip()
+        question = str(row.get("question_canonique", "")).strip()
+        if question:
+            out.append((question, label))
+        kws = _keyword_list(row.get("mots_cles", ""))
+        for i in range(0, len(kws), group):
+            out.append((" ".join(kws[i:i + group]), label))
+    return out
+
+
+def interaction_queries(db_path, limit: int) -> list:
+    """[(requête, catégorie attendue | None)] : dernières requêtes journalisées."""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT query, intent, feedback FROM interactions ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [(q, intent if feedback == "like" else None) for q, intent, feedback in rows if q]
+
+
+# ------------ Corpus synthétique ------------
+def scale_faq(faq: pd.DataFrame, n_docs: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Complète la FAQ jusqu'à `n_docs` lignes synthétiques : variante bruitée d'une ligne réelle
+    (la plupart de ses mots et mots-clés, même catégorie) mêlée de mots d'une autre ligne.
+    """
+    if n_docs <= len(faq):
+        return faq
+    rng = np.random.default_rng(seed)
+    words = [str(t).split() for t in faq["index_text"]]
+    kws = [_keyword_list(k) for k in faq["mots_cles"]] if "mots_cles" in faq.columns else None
+    rows = []
+    for i in range(n_docs - len(faq)):
+        a, b = rng.choice(len(faq), size=2)
+        text = [w for w in words[a] if rng.random() < 0.7] + [w for w in words[b] if rng.random() < 0.2]
+        row = {"id": f"syn{i}", "categorie": faq["categorie"].iat[a],
+               "question_canonique": f"{faq['question_canonique'].iat[a]} ({i})",
+               "reponse": " ".join(text), "index_text": " ".join(text)}
+        if kws is not None:
+            row["mots_cles"] = ";".join([k for k in kws[a] if rng.random() < 0.7] + [k for k in kws[b] if rng.random() < 0.2])
+        rows.append(row)
+    return pd.concat([faq, pd.DataFrame(rows)], ignore_index=True).fillna("")
+
+
+def with_corpus(pipe, faq: pd.DataFrame, retriever_cfg: dict):
+    """Copie du pipeline avec un autre corpus / d'autres paramètres de recherche (index en mémoire)."""
+    clone = copy.copy(pipe)
+    clone.answers = AnswerStore.from_frame(faq)
+    clone.retr = Retriever(faq["index_text"], faq, **retriever_cfg)
+    return clone
+
+
+# ------------ Mesures ------------
+def quality(hits_list, labels, categories, k: int) -> dict:
+    """recall@1, recall@k et MRR sur les requêtes étiquetées (pertinent = même catégorie de ligne)."""
+    cats = [str(c).strip() for c in categories]
+    r1 = rk = rr = 0.0
+    n = 0
+    for hits, label in zip(hits_list, labels):
+        if label is None:
+            continue
+        n += 1
+        ranks = [r for r, (idx, _) in enumerate(hits[:k], 1) if cats[idx] == label]
+        if ranks:
+            r1 += ranks[0] == 1
+            rk += 1
+            rr += 1.0 / ranks[0]
+    if not n:
+        return {"labeled": 0}
+    return {"labeled": n, "recall@1": r1 / n, f"recall@{k}": rk / n, "mrr": rr / n}
+
+
+def run(pipe, queries: list, sink) -> dict:
+    """Rejoue les requêtes étape par étape (sans cache) ; durées en ns par étape et par requête."""
+    timings = {s: np.zeros(len(queries), dtype=np.int64) for s in STAGES}
+    hits_list = []
+    session_id = f"eval_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    t_start = time.perf_counter_ns()
+    for i, (q, _) in enumerate(queries):
+        t0 = time.perf_counter_ns()
+        ents = pipe.ner.extract(q)
+        t1 = time.perf_counter_ns()
+        hits = pipe.retr.search(q, top_k=pipe.top_k)
+        t2 = time.perf_counter_ns()
+        response, intent, score = engine.render_answer(pipe, hits, ents)
+        t3 = time.perf_counter_ns()
+        sink.log_interaction(datetime.now().isoformat(), q, response, json.dumps(ents),
+                             intent, score, session_id, (t3 - t0) / 1e9)
+        t4 = time.perf_counter_ns()
+        for s, dt in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            timings[s][i] = dt
+        hits_list.append(hits)
+    t_flush = time.perf_counter_ns()
+    sink.flush()
+    t_end = time.perf_counter_ns()
+
+    total = sum(timings.values())
+    report = {"queries": len(queries), "qps": len(queries) / ((t_end - t_start) / 1e9),
+              "flush_ms": (t_end - t_flush) / 1e6}
+    for s, arr in list(timings.items()) + [("total", total)]:
+        report[s] = {f"p{p}": float(np.percentile(arr, p)) / 1e6 for p in PERCENTILES}
+    report["quality"] = quality(hits_list, [label for _, label in queries], pipe.answers.categories, pipe.top_k)
+    return report
+
+
+# ------------ Balayage ------------
+def _parse_value(name: str, raw: str):
+    if name == "ngram_range":
+        lo, hi = raw.split("-")
+        return (int(lo), int(hi))
+    if name == "min_df":
+        return float(raw) if "." in raw else int(raw)
+    if name == "max_features":
+        return None if raw.lower() == "none" else int(raw)
+    if name == "compact":
+        return raw.lower() in ("1", "true", "yes", "oui")
+    return float(raw)
+
+
+def parse_sweep(specs: list) -> list:
+    """["keyword_weight=0,0.3", "ngram_range=1-1,1-2"] -> [{...}, ...] (produit cartésien)."""
+    grid = {}
+    for spec in specs:
+        name, values = spec.split("=", 1)
+        grid[name] = [_parse_value(name, v) for v in values.split(",")]
+    return [dict(zip(grid, combo)) for combo in itertools.product(*grid.values())]
+
+
+def retriever_config(pipe) -> dict:
+    retr_cfg = pipe.cfg.get("retriever", {})
+    nr = retr_cfg.get("ngram_range", (1, 2))
+    return {
+        "ngram_range": (int(nr[0]), int(nr[1])),
+        "min_df": retr_cfg.get("min_df", 1),
+        "max_df": retr_cfg.get("max_df", 0.95),
+        "keyword_weight": float(retr_cfg.get("keyword_weight", 0.30)),
+        "threshold": float(retr_cfg.get("threshold", 0.0)),
+        "candidate_ratio": float(retr_cfg.get("candidate_ratio", 0.10)),
+        "max_features": retr_cfg.get("max_features"),
+        "compact": bool(retr_cfg.get("compact", False)),
+    }
+
+
+def _print_report(label: str, rep: dict):
+    qual = rep["quality"]
+    print(f"\n== {label} : {rep['queries']} requêtes, {rep['qps']:.0f} req/s, flush {rep['flush_ms']:.1f} ms")
+    print(f"{'étape':>10} " + " ".join(f"{'p' + str(p) + ' (ms)':>10}" for p in PERCENTILES))
+    for s in STAGES + ("total",):
+        print(f"{s:>10} " + " ".join(f"{rep[s]['p' + str(p)]:>10.3f}" for p in PERCENTILES))
+    if qual.get("labeled"):
+        print("qualité : " + ", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}"
+                                       for k, v in qual.items()))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Évaluation hors ligne (qualité + latence par étape)")
+    ap.add_argument("--config", default="config.yaml")
+    ap.add_argument("--source", choices=("faq", "interactions"), default="faq")
+    ap.add_argument("--db", default=str(BASE_DIR / "chatbot_analytics.db"), help="source des interactions")
+    ap.add_argument("--limit", type=int, default=1000, help="nombre max. d'interactions rejouées")
+    ap.add_argument("--repeat", type=int, default=5, help="répétitions du jeu de requêtes (latence)")
+    ap.add_argument("--scale", type=int, nargs="*", default=[], help="tailles de corpus synthétiques")
+    ap.add_argument("--sweep", nargs="*", default=[], help="param=v1,v2 ... (produit cartésien)")
+    ap.add_argument("--json", help="écrit les résultats dans ce fichier")
+    args = ap.parse_args()
+
+    pipe = get_pipeline(BASE_DIR, args.config)
+    base_faq = load_faq(pipe.faq_path)  # le pipeline ne garde pas le DataFrame
+    if args.source == "faq":
+        queries = faq_queries(base_faq)
+    else:
+        queries = interaction_queries(args.db, args.limit)
+    if not queries:
+        raise SystemExit("aucune requête à rejouer")
+    queries = queries * max(args.repeat, 1)
+
+    base_cfg = retriever_config(pipe)
+    configs = [{**base_cfg, **override} for override in parse_sweep(args.sweep)] or [base_cfg]
+    sizes = [len(base_faq)] + [n for n in args.scale if n > len(base_faq)]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = AnalyticsSink(Path(tmp) / "eval.db")  # journalisation mesurée sans toucher la vraie base
+        try:
+            for n_docs in sizes:
+                faq = scale_faq(base_faq, n_docs)
+                for cfg in configs:
+                    t0 = time.perf_counter()
+                    variant = with_corpus(pipe, faq, cfg)
+                    build_s = time.perf_counter() - t0
+                    rep = run(variant, queries, sink)
+                    rep.update({"n_docs": n_docs, "build_s": build_s,
+                                "config": {k: list(v) if isinstance(v, tuple) else v for k, v in cfg.items()}})
+                    results.append(rep)
+                    _print_report(f"{n_docs} docs, {rep['config']} (index {build_s:.2f} s)", rep)
+        finally:
+            sink.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,597 @@
+# src/analytics.py — base analytics SQLite : schéma + écriture groupée en arrière-plan
+import atexit
+import bisect
+import collections
+import csv
+import io
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from typing import Iterator, Optional
+
+from src.metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS interactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT,
+        query TEXT,
+        response TEXT,
+        entities TEXT,
+        intent TEXT,
+        confidence_score REAL,
+        feedback TEXT,
+        session_id TEXT,
+        response_time REAL
+    )
+'''
+
+# Version 1 : index + tables d'agrégats maintenues par triggers (mises à jour à chaque écriture,
+# dans la même transaction que l'interaction), et table normalisée des entités.
+_SCHEMA_V1 = '''
+    CREATE INDEX IF NOT EXISTS idx_interactions_timestamp ON interactions(timestamp);
+    CREATE INDEX IF NOT EXISTS idx_interactions_intent ON interactions(intent);
+    CREATE INDEX IF NOT EXISTS idx_interactions_session ON interactions(session_id);
+
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        day TEXT PRIMARY KEY,
+        questions INTEGER NOT NULL DEFAULT 0,
+        likes INTEGER NOT NULL DEFAULT 0,
+        dislikes INTEGER NOT NULL DEFAULT 0,
+        response_time_sum REAL NOT NULL DEFAULT 0,
+        response_time_count INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS intent_stats (
+        intent TEXT PRIMARY KEY,
+        questions INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY
+    );
+    CREATE TABLE IF NOT EXISTS interaction_entities (
+        interaction_id INTEGER NOT NULL,
+        entity_type TEXT NOT NULL,
+        value TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_interaction_entities_id ON interaction_entities(interaction_id);
+    CREATE TABLE IF NOT EXISTS entity_stats (
+        value TEXT PRIMARY KEY,
+        mentions INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_interactions_insert AFTER INSERT ON interactions
+    BEGIN
+        INSERT INTO daily_stats (day, questions, likes, dislikes, response_time_sum, response_time_count)
+        VALUES (substr(NEW.timestamp, 1, 10), 1, NEW.feedback IS 'like', NEW.feedback IS 'dislike',
+                COALESCE(NEW.response_time, 0), NEW.response_time IS NOT NULL)
+        ON CONFLICT(day) DO UPDATE SET
+            questions = questions + 1,
+            likes = likes + excluded.likes,
+            dislikes = dislikes + excluded.dislikes,
+            response_time_sum = response_time_sum + excluded.response_time_sum,
+            response_time_count = response_time_count + excluded.response_time_count;
+
+        INSERT INTO intent_stats (intent, questions) SELECT NEW.intent, 1 WHERE NEW.intent IS NOT NULL
+        ON CONFLICT(intent) DO UPDATE SET questions = questions + 1;
+
+        INSERT OR IGNORE INTO sessions (session_id) SELECT NEW.session_id WHERE NEW.session_id IS NOT NULL;
+
+        INSERT INTO interaction_entities (interaction_id, entity_type, value)
+        SELECT NEW.id, e.key, v.value
+        FROM json_each(CASE WHEN json_valid(NEW.entities) THEN NEW.entities END) e, json_each(e.value) v;
+
+        INSERT INTO entity_stats (value, mentions)
+        SELECT value, COUNT(*) FROM interaction_entities WHERE interaction_id = NEW.id GROUP BY value
+        ON CONFLICT(value) DO UPDATE SET mentions = mentions + excluded.mentions;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_interactions_feedback AFTER UPDATE OF feedback ON interactions
+    WHEN OLD.feedback IS NOT NEW.feedback
+    BEGIN
+        UPDATE daily_stats SET
+            likes = likes + (NEW.feedback IS 'like') - (OLD.feedback IS 'like'),
+            dislikes = dislikes + (NEW.feedback IS 'dislike') - (OLD.feedback IS 'dislike')
+        WHERE day = substr(NEW.timestamp, 1, 10);
+    END;
+'''
+
+# Remplissage initial des agrégats à partir de l'historique existant (migration vers v1)
+_BACKFILL_V1 = '''
+    INSERT INTO daily_stats (day, questions, likes, dislikes, response_time_sum, response_time_count)
+    SELECT substr(timestamp, 1, 10), COUNT(*), SUM(feedback IS 'like'), SUM(feedback IS 'dislike'),
+           COALESCE(SUM(response_time), 0), COUNT(response_time)
+    FROM interactions GROUP BY 1;
+    INSERT INTO intent_stats (intent, questions)
+    SELECT intent, COUNT(*) FROM interactions WHERE intent IS NOT NULL GROUP BY intent;
+    INSERT OR IGNORE INTO sessions (session_id)
+    SELECT DISTINCT session_id FROM interactions WHERE session_id IS NOT NULL;
+    INSERT INTO interaction_entities (interaction_id, entity_type, value)
+    SELECT i.id, e.key, v.value
+    FROM interactions i, json_each(CASE WHEN json_valid(i.entities) THEN i.entities END) e, json_each(e.value) v;
+    INSERT INTO entity_stats (value, mentions)
+    SELECT value, COUNT(*) FROM interaction_entities GROUP BY value;
+'''
+
+# Version 2 : détail par étape du temps de réponse (JSON {étape: ms}, cf. src.metrics)
+_SCHEMA_V2 = '''
+    ALTER TABLE interactions ADD COLUMN stage_times TEXT;
+'''
+
+# Version 3 : filigrane de la base (cf. read_watermark) — compteurs d'insertions, de changements
+# de feedback et de réinitialisations, tenus à jour par triggers / reset_db.
+_SCHEMA_V3 = '''
+    CREATE TABLE IF NOT EXISTS analytics_state (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    );
+    INSERT OR IGNORE INTO analytics_state (key, value)
+    VALUES ('inserts', (SELECT COUNT(*) FROM interactions)), ('feedback_version', 0), ('generation', 0);
+
+    CREATE TRIGGER IF NOT EXISTS trg_state_insert AFTER INSERT ON interactions
+    BEGIN
+        UPDATE analytics_state SET value = value + 1 WHERE key = 'inserts';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_state_feedback AFTER UPDATE OF feedback ON interactions
+    WHEN OLD.feedback IS NOT NEW.feedback
+    BEGIN
+        UPDATE analytics_state SET value = value + 1 WHERE key = 'feedback_version';
+    END;
+'''
+
+_ROLLUP_TABLES = ["daily_stats", "intent_stats", "sessions", "interaction_entities", "entity_stats"]
+
+_SQL = {
+    "insert": '''
+        INSERT INTO interactions (id, timestamp, query, response, entities, intent, confidence_score,
+                                  session_id, response_time, stage_times)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    "feedback": 'UPDATE interactions SET feedback = ? WHERE id = ?',
+}
+
+
+def connect(db_path, **kwargs) -> sqlite3.Connection:
+    """Connexion SQLite en mode WAL (les lectures du tableau de bord ne bloquent pas l'écriture)."""
+    conn = sqlite3.connect(db_path, timeout=30, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def init_db(db_path):
+    """Initialise la base de données analytics (et migre les bases existantes vers les agrégats)"""
+    conn = connect(db_path, isolation_level=None)
+    try:
+        conn.execute(_SCHEMA)
+        conn.execute("BEGIN IMMEDIATE")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            for stmt in _split_script(_SCHEMA_V1 + _BACKFILL_V1):
+                conn.execute(stmt)
+        if version < 2:
+            for stmt in _split_script(_SCHEMA_V2):
+                conn.execute(stmt)
+        if version < 3:
+            for stmt in _split_script(_SCHEMA_V3):
+                conn.execute(stmt)
+            conn.execute("PRAGMA user_version = 3")
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def _split_script(script: str) -> list:
+    """Découpe un script SQL en instructions complètes (les corps de triggers contiennent des ';')."""
+    stmts, current = [], ""
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            stmts.append(current.strip())
+            current = ""
+    return [s for s in stmts if s]
+
+
+def reset_db(db_path):
+    """Supprime toutes les interactions et remet les agrégats à zéro."""
+    with connect(db_path) as conn:
+        conn.execute("DELETE FROM interactions")
+        for table in _ROLLUP_TABLES:
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("UPDATE analytics_state SET value = value + 1 WHERE key = 'generation'")
+    conn.close()
+
+
+# --------- Lectures pour le tableau de bord (agrégats uniquement) ----------
+def read_watermark(conn) -> tuple:
+    """
+    Filigrane (réinitialisations, insertions, changements de feedback, id max) : change à
+    chaque écriture visible dans le tableau de bord, lu en une requête sur des lignes uniques.
+    """
+    return conn.execute('''
+        SELECT (SELECT value FROM analytics_state WHERE key = 'generation'),
+               (SELECT value FROM analytics_state WHERE key = 'inserts'),
+               (SELECT value FROM analytics_state WHERE key = 'feedback_version'),
+               (SELECT COALESCE(MAX(id), 0) FROM interactions)
+    ''').fetchone()
+
+
+def read_metrics(conn) -> dict:
+    """Métriques principales calculées depuis les agrégats journaliers"""
+    questions, likes, dislikes, rt_sum, rt_count = conn.execute('''
+        SELECT COALESCE(SUM(questions), 0), COALESCE(SUM(likes), 0), COALESCE(SUM(dislikes), 0),
+               COALESCE(SUM(response_time_sum), 0), COALESCE(SUM(response_time_count), 0)
+        FROM daily_stats
+    ''').fetchone()
+    total_feedback = likes + dislikes
+    return {
+        "total_questions": questions,
+        "satisfaction_rate": (likes / total_feedback) * 100 if total_feedback > 0 else 0,
+        "avg_response_time": rt_sum / rt_count if rt_count > 0 else 0,
+        "unique_sessions": conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0],
+    }
+
+
+def read_daily_questions(conn) -> list:
+    return conn.execute("SELECT day, questions FROM daily_stats ORDER BY day").fetchall()
+
+
+def read_intent_counts(conn) -> list:
+    return conn.execute("SELECT intent, questions FROM intent_stats ORDER BY questions DESC").fetchall()
+
+
+def read_top_entities(conn, n: int = 10) -> list:
+    return conn.execute("SELECT value, mentions FROM entity_stats ORDER BY mentions DESC LIMIT ?", (n,)).fetchall()
+
+
+def _latency_rows(conn, n: int, after_id: int = 0) -> list:
+    """(id, temps de réponse, {étape: ms} ou None) des `n` dernières interactions d'id > after_id, id croissant."""
+    rows = conn.execute(
+        "SELECT id, response_time, stage_times FROM interactions WHERE id > ? ORDER BY id DESC LIMIT ?",
+        (after_id, n),
+    ).fetchall()
+    out = []
+    for interaction_id, rt, raw in reversed(rows):
+        try:
+            stages = json.loads(raw) if raw else None
+        except ValueError:
+            stages = None
+        out.append((interaction_id, rt, stages))
+    return out
+
+
+def _row_samples(row):
+    """(étape, ms) d'une ligne de _latency_rows : temps total puis chaque étape."""
+    _, rt, stages = row
+    if rt is not None:
+        yield "total", rt * 1000
+    for stage, ms in (stages or {}).items():
+        if stage != "total":
+            yield stage, ms
+
+
+def _latency_summary(samples: dict) -> dict:
+    return {
+        stage: {"count": len(values), **{f"p{p}": percentile(values, p) for p in (50, 95, 99)}}
+        for stage, values in samples.items() if values
+    }
+
+
+def read_latency(conn, n: int = 5000) -> dict:
+    """
+    Percentiles (p50/p95/p99, en ms) du temps de réponse et de chaque étape,
+    sur les `n` dernières interactions.
+    """
+    samples = {"total": []}
+    for row in _latency_rows(conn, n):
+        for stage, ms in _row_samples(row):
+            samples.setdefault(stage, []).append(ms)
+    return _latency_summary(samples)
+
+
+def read_recent(conn, n: int = 10) -> list:
+    return conn.execute('''
+        SELECT timestamp, query, intent, confidence_score, feedback
+        FROM interactions ORDER BY timestamp DESC LIMIT ?
+    ''', (n,)).fetchall()
+
+
+# --------- Export CSV (flux par lots, mémoire constante) ----------
+def _export_query(start: Optional[date], end: Optional[date]) -> tuple:
+    """SELECT * des interactions du jour `start` au jour `end` inclus (bornes optionnelles), plus récentes d'abord."""
+    where, params = [], []
+    if start is not None:
+        where.append("timestamp >= ?")
+        params.append(start.isoformat())
+    if end is not None:
+        where.append("timestamp < ?")  # timestamps ISO : comparaison de chaînes
+        params.append((end + timedelta(days=1)).isoformat())
+    sql = "SELECT * FROM interactions"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY timestamp DESC", params
+
+
+def iter_export_csv(db_path, start: Optional[date] = None, end: Optional[date] = None,
+                    compress: bool = False, batch_size: int = 5000) -> Iterator[bytes]:
+    """
+    CSV (UTF-8, en-tête = colonnes de la table) des interactions, produit par blocs :
+    le curseur SQLite est lu par lots de `batch_size` lignes et chaque lot est encodé (et
+    compressé en gzip si `compress`) avant de lire le suivant. Une seule requête : instantané
+    cohérent de la base (WAL), sans bloquer les écritures.
+    """
+    conn = connect(db_path)
+    gz = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    try:
+        cur = conn.execute(*_export_query(start, end))
+        writer.writerow([col[0] for col in cur.description])
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if rows:
+                writer.writerows(rows)
+            chunk = buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+            if gz is not None:
+                chunk = gz.compress(chunk) + (b"" if rows else gz.flush())
+            if chunk:
+                yield chunk
+            if not rows:
+                break
+    finally:
+        conn.close()
+
+
+def export_csv(db_path, dest, start: Optional[date] = None, end: Optional[date] = None,
+               compress: bool = False, batch_size: int = 5000) -> int:
+    """Écrit iter_export_csv dans `dest` (chemin ou fichier binaire) ; renvoie le nombre d'octets écrits."""
+    written = 0
+    f = open(dest, "wb") if isinstance(dest, (str, bytes)) or hasattr(dest, "__fspath__") else dest
+    try:
+        for chunk in iter_export_csv(db_path, start, end, compress, batch_size):
+            f.write(chunk)
+            written += len(chunk)
+    finally:
+        if f is not dest:
+            f.close()
+    return written
+
+
+class AnalyticsSink:
+    """
+    File d'attente bornée d'interactions écrites par un thread dédié, par lots
+    (une transaction par lot), pour sortir les fsync SQLite du chemin de réponse.
+    - Les id sont réservés par blocs dans sqlite_sequence : log_interaction() renvoie
+      l'id de la ligne immédiatement, sans requête supplémentaire, y compris à plusieurs processus.
+    - Les mises à jour de feedback passent par la même file (appliquées après l'insertion).
+    - close() (appelé aussi à la sortie du processus) vide la file avant d'arrêter le thread.
+    """
+
+    def __init__(self, db_path, batch_size: int = 200, flush_interval: float = 0.2,
+                 max_queue: int = 10_000, id_block: int = 1000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.id_block = id_block
+        init_db(db_path)
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._id_lock = threading.Lock()
+        self._next_id = 1
+        self._last_id = 0      # bloc réservé : [_next_id, _last_id]
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ---- API appelée sur le chemin de requête ----
+    def log_interaction(self, timestamp, query, response, entities, intent,
+                        confidence_score, session_id, response_time, stage_times=None) -> int:
+        """`stage_times` : {étape: ms} optionnel, stocké en JSON avec l'interaction."""
+        interaction_id = self._allocate_id()
+        self._queue.put(("insert", (interaction_id, timestamp, query, response, entities, intent,
+                                    confidence_score, session_id, response_time,
+                                    json.dumps(stage_times) if stage_times else None)))
+        return interaction_id
+
+    def update_feedback(self, interaction_id, feedback_type):
+        self._queue.put(("feedback", (feedback_type, interaction_id)))
+
+    def flush(self):
+        """Attend que tous les enregistrements en file soient écrits."""
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    # ---- Réservation des id ----
+    def _allocate_id(self) -> int:
+        with self._id_lock:
+            if self._next_id > self._last_id:
+                self._reserve_block()
+            interaction_id = self._next_id
+            self._next_id += 1
+            return interaction_id
+
+    def _reserve_block(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'interactions'").fetchone()
+            if row is None:
+                seq = conn.execute("SELECT COALESCE(MAX(id), 0) FROM interactions").fetchone()[0]
+                conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('interactions', ?)",
+                             (seq + self.id_block,))
+            else:
+                seq = row[0]
+                conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'interactions'",
+                             (seq + self.id_block,))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        self._next_id, self._last_id = seq + 1, seq + self.id_block
+
+    # ---- Thread d'écriture ----
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = connect(self.db_path, check_same_thread=False)
+        stop = False
+        while not stop:
+            batch = self._next_batch()
+            stop = batch[-1] is None
+            records = [item for item in batch if item is not None]
+            try:
+                with conn:  # une seule transaction (donc un seul fsync) par lot
+                    for kind, params in records:
+                        conn.execute(_SQL[kind], params)
+            except sqlite3.Error:
+                logger.exception("Échec d'écriture de %d enregistrements analytics", len(records))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+
+# --------- Sink partagé par processus ----------
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+def get_sink(db_path) -> AnalyticsSink:
+    key = str(db_path)
+    with _sinks_lock:
+        if key not in _sinks:
+            _sinks[key] = AnalyticsSink(db_path)
+        return _sinks[key]
+
+
+# --------- Cache du tableau de bord ----------
+class DashboardCache:
+    """
+    Données du tableau de bord (mêmes lectures que read_metrics, read_latency...) gardées en
+    mémoire pour le filigrane de la base (read_watermark) où elles ont été lues : tant
+    qu'aucune interaction ni feedback n'arrive, get() ne lit que le filigrane. Sinon :
+    - agrégats et dernières interactions relus (tables de rollup, LIMIT sur index) ;
+    - latences : seules les interactions d'id > id max du filigrane précédent sont lues et
+      ajoutées à la fenêtre des `latency_n` dernières. Relecture complète après une
+      réinitialisation, ou si des lignes d'id plus petit sont arrivées entre-temps (ids
+      réservés par blocs par un autre processus) ; un changement de feedback seul ne les relit pas.
+    Le dict renvoyé est partagé entre sessions : ne pas le modifier.
+    """
+
+    def __init__(self, db_path, recent_n: int = 10, top_entities: int = 10, latency_n: int = 5000):
+        self.db_path = db_path
+        self.recent_n = recent_n
+        self.top_entities = top_entities
+        self.latency_n = latency_n
+        self.stats = {"hits": 0, "incremental": 0, "full": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._watermark = None
+        self._data = None
+        self._latency_rows = collections.deque()  # fenêtre des latency_n dernières lignes, id croissant
+        self._samples = {}  # étape -> valeurs (ms) de la fenêtre, triées
+
+    def get(self) -> dict:
+        with self._lock:
+            if self._conn is None:
+                self._conn = connect(self.db_path, isolation_level=None, check_same_thread=False)
+            conn = self._conn
+            conn.execute("BEGIN")  # filigrane et données lus dans le même instantané
+            try:
+                watermark = read_watermark(conn)
+                if watermark != self._watermark:
+                    old, self._watermark = self._watermark, None  # si la lecture échoue : relecture complète
+                    self._data = self._refresh(conn, old, watermark)
+                    self._watermark = watermark
+                else:
+                    self.stats["hits"] += 1
+            finally:
+                conn.execute("COMMIT")
+            return self._data
+
+    def _refresh(self, conn, old: tuple, watermark: tuple) -> dict:
+        generation, inserts = watermark[:2]
+        latency = None
+        if old is not None and old[0] == generation:
+            if old[1] == inserts:
+                latency = self._data["latency"]  # feedback seul : latences inchangées
+            else:
+                new_rows = _latency_rows(conn, self.latency_n, old[3])
+                if len(new_rows) == inserts - old[1]:
+                    self._push_rows(new_rows)
+                    latency = _latency_summary(self._samples)
+                    self.stats["incremental"] += 1
+        if latency is None:
+            self._latency_rows = collections.deque(_latency_rows(conn, self.latency_n))
+            self._samples = {"total": []}
+            for row in self._latency_rows:
+                for stage, ms in _row_samples(row):
+                    self._samples.setdefault(stage, []).append(ms)
+            for values in self._samples.values():
+                values.sort()
+            latency = _latency_summary(self._samples)
+            self.stats["full"] += 1
+        return {
+            "watermark": watermark,
+            "metrics": read_metrics(conn),
+            "latency": latency,
+            "daily": read_daily_questions(conn),
+            "intents": read_intent_counts(conn),
+            "entities": read_top_entities(conn, self.top_entities),
+            "recent": read_recent(conn, self.recent_n),
+        }
+
+    def _push_rows(self, rows):
+        """Ajoute des lignes (id croissant) à la fenêtre ; les plus anciennes en sortent."""
+        for row in rows:
+            if len(self._latency_rows) == self.latency_n:
+                for stage, ms in _row_samples(self._latency_rows.popleft()):
+                    values = self._samples[stage]
+                    del values[bisect.bisect_left(values, ms)]
+            self._latency_rows.append(row)
+            for stage, ms in _row_samples(row):
+                bisect.insort(self._samples.setdefault(stage, []), ms)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_dashboards = {}
+
+
+def get_dashboard_cache(db_path) -> DashboardCache:
+    key = str(db_path)
+    with _sinks_lock:
+        if key not in _dashboards:
+            init_db(db_path)
+            _dashboards[key] = DashboardCache(db_path)
+        return _dashboards[key]
@@ -0,0 +1,72 @@
+# src/cache.py — cache LRU/TTL des résultats de recherche, indexé sur la requête normalisée
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from src.retriever import _normalize
+
+
+def query_key(fingerprint: Optional[str], query: str) -> tuple:
+    """
+    Clé de cache : empreinte de l'index + requête normalisée (casse, accents, pluriels...).
+    Ne convient qu'à ce qui ne dépend que de la forme normalisée (les résultats du retriever,
+    qui normalise lui-même la requête) ; la NER lit la requête brute.
+    """
+    return (fingerprint, _normalize(query))
+
+
+class QueryCache:
+    """
+    Cache LRU borné avec expiration (TTL), sûr entre threads.
+    - maxsize : nombre maximal d'entrées (la moins récemment utilisée est évincée)
+    - ttl     : durée de vie d'une entrée en secondes (None = pas d'expiration)
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires, value = item
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,147 @@
+# src/engine.py — pipeline de réponse indépendant de l'interface (Streamlit, HTTP...)
+import json
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from src.cache import query_key
+from src.metrics import REGISTRY, Trace, span
+
+NOT_FOUND_RESPONSE = "Désolé, je n'ai pas trouvé d'information pertinente."
+DEFAULT_INTENT = "info_generale_uvbf"   # catégorie par défaut si rien trouvé
+
+
+def compute_answer(pipe, query: str, hits=None, trace: Optional[Trace] = None) -> tuple:
+    """
+    NER + recherche + rendu template (sans cache ni logging) -> (réponse, entités, intention, score).
+    `hits`  : résultats de recherche déjà calculés (ex: par search_batch).
+    `trace` : reçoit la durée de chaque étape (ner, tfidf, scoring, render).
+    """
+    # 1) Extraction d'entités (NER)
+    with span(trace, "ner"):
+        ents = pipe.ner.extract(query)
+
+    # 2) Recherche FAQ (retriever)
+    if hits is None:
+        hits = pipe.retr.search(query, top_k=pipe.top_k, trace=trace)
+
+    # 3) Réponse à partir du meilleur candidat
+    with span(trace, "render"):
+        response, intent_final, score = render_answer(pipe, hits, ents)
+    return response, ents, intent_final, score
+
+
+def render_answer(pipe, hits, ents: dict) -> tuple:
+    """Réponse à partir des résultats de recherche et des entités -> (réponse, intention, score)."""
+    if not hits:
+        return NOT_FOUND_RESPONSE, DEFAULT_INTENT, 0.0
+
+    # meilleur candidat (colonnes de la FAQ en tuples : pas de pandas par requête)
+    idx, score = hits[0]
+    answers = pipe.answers
+
+    # Catégorie vraie issue du CSV (sera utilisée comme 'intent' pour l'analytics et les templates)
+    intent_final = answers.categories[idx] or DEFAULT_INTENT
+
+    # Option templates : on tente un rendu avec la catégorie trouvée
+    # Si pas de template ou info manquante -> on renvoie la réponse CSV
+    rendered = pipe.tm.render(intent_final, ents)
+    if rendered and (not rendered.get("need_more_info")) and rendered.get("text"):
+        response = rendered["text"]
+    else:
+        # Réponse brute de la FAQ (CSV simplifié), mise en forme au chargement
+        response = answers.fallbacks[idx]
+    return response, intent_final, float(score)
+
+
+def _log(sink, query, result: tuple, session_id, response_time, stage_times=None):
+    """Met l'interaction en file dans le sink analytics ; renvoie son id (None sans sink)."""
+    if sink is None:
+        return None
+    response, ents, intent_final, confidence_score = result
+    session_id = session_id or f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    return sink.log_interaction(
+        datetime.now().isoformat(), query, response, json.dumps(ents),
+        intent_final, confidence_score, session_id, response_time, stage_times
+    )
+
+
+def _finish(trace: Trace, start_ns: int, sink, query, result, session_id) -> dict:
+    """
+    Journalise l'interaction (temps de réponse = calcul seul, hors écriture analytics,
+    avec le détail par étape) puis alimente les histogrammes du processus.
+    """
+    trace.add("total", time.perf_counter_ns() - start_ns)
+    with trace.span("logging"):
+        interaction_id = _log(sink, query, result, session_id, trace.spans["total"] / 1e9, trace.ms())
+    REGISTRY.record(trace)
+    return _as_dict(result, interaction_id)
+
+
+def _as_dict(result: tuple, interaction_id) -> dict:
+    response, ents, intent_final, confidence_score = result
+    return {
+        "response": response,
+        "entities": ents,
+        "intent": intent_final,
+        "confidence": confidence_score,
+        "interaction_id": interaction_id,
+    }
+
+
+def answer(pipe, query: str, sink=None, session_id: Optional[str] = None) -> dict:
+    """
+    Réponse complète à une requête : résultats de recherche en cache (requête normalisée +
+    empreinte de l'index), NER et rendu recalculés pour la requête exacte (la NER lit la
+    requête brute : « LICENCE » et « licence » n'ont pas forcément les mêmes entités), puis
+    enregistrement de l'interaction dans `sink` (AnalyticsSink) si fourni.
+    Chaque étape est mesurée (src.metrics) : histogrammes du processus + détail stocké
+    avec l'interaction.
+    """
+    start = time.perf_counter_ns()
+    trace = Trace()
+
+    with trace.span("cache"):
+        key = query_key(pipe.retr.fingerprint, query)
+        hits = pipe.cache.get(key)
+    if hits is None:
+        hits = tuple(pipe.retr.search(query, top_k=pipe.top_k, trace=trace))
+        pipe.cache.put(key, hits)
+    result = compute_answer(pipe, query, hits, trace=trace)
+
+    # Logging (asynchrone : l'id est connu sans attendre l'écriture)
+    return _finish(trace, start, sink, query, result, session_id)
+
+
+def answer_batch(pipe, queries: List[str], sink=None, session_id: Optional[str] = None) -> List[dict]:
+    """
+    Comme [answer(q) for q in queries], mais les requêtes absentes du cache sont cherchées
+    ensemble (Retriever.search_batch). Les étapes communes au lot (cache, tfidf, scoring)
+    sont réparties entre ses requêtes.
+    """
+    n = max(len(queries), 1)
+    shared = Trace()
+    with shared.span("cache"):
+        keys = [query_key(pipe.retr.fingerprint, q) for q in queries]
+        cached = [pipe.cache.get(k) for k in keys]
+    misses = [i for i, h in enumerate(cached) if h is None]
+    hits_by_index = {}
+    if misses:
+        hits_list = pipe.retr.search_batch([queries[i] for i in misses], top_k=pipe.top_k, trace=shared)
+        hits_by_index = {i: tuple(h) for i, h in zip(misses, hits_list)}
+        for i, hits in hits_by_index.items():
+            pipe.cache.put(keys[i], hits)
+
+    out = []
+    for i, q in enumerate(queries):
+        t0 = time.perf_counter_ns()
+        trace = Trace()
+        trace.add("cache", shared.spans["cache"] // n)
+        if i in hits_by_index:
+            for name in ("tfidf", "scoring"):
+                trace.add(name, shared.spans.get(name, 0) // len(misses))
+        share = sum(trace.spans.values())  # part des étapes communes, comptée dans le total
+        hits = hits_by_index[i] if i in hits_by_index else cached[i]
+        result = compute_answer(pipe, q, hits, trace=trace)
+        out.append(_finish(trace, t0 - share, sink, q, result, session_id))
+    return out
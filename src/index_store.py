@@ -0,0 +1,169 @@
+# src/index_store.py — index de recherche persisté sur disque (memmap) avec empreinte
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from scipy import sparse
+
+from src.normalizer import DEFAULT_RULES_PATH
+from src.retriever import Retriever
+from src.vocabulary import HashedTermSet, HashedVocabulary
+
+# À incrémenter si le format sur disque ou la construction des documents change
+INDEX_FORMAT_VERSION = 4
+
+_META = "meta.json"
+
+
+def _file_digest(path, h=None):
+    h = h or hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h
+
+
+def fingerprint(faq_path: str, retriever_cfg: dict) -> str:
+    """
+    Empreinte de l'index : contenu du CSV + règles de normalisation + configuration
+    du retriever + version du format. Tout changement impose une reconstruction.
+    """
+    h = hashlib.sha256(f"v{INDEX_FORMAT_VERSION}".encode())
+    _file_digest(faq_path, h)
+    _file_digest(DEFAULT_RULES_PATH, h)
+    h.update(json.dumps(retriever_cfg, sort_keys=True, default=list).encode())
+    return h.hexdigest()[:32]
+
+
+def _save_csr(directory: Path, prefix: str, mat):
+    mat = sparse.csr_matrix(mat)
+    np.save(directory / f"{prefix}_data.npy", mat.data)
+    np.save(directory / f"{prefix}_indices.npy", mat.indices)
+    np.save(directory / f"{prefix}_indptr.npy", mat.indptr)
+    return list(mat.shape)
+
+
+def _load_csr(directory: Path, prefix: str, shape, mmap_mode: Optional[str]):
+    arrays = [np.load(directory / f"{prefix}_{part}.npy", mmap_mode=mmap_mode) for part in ("data", "indices", "indptr")]
+    # copy=False : les memmaps sont utilisés tels quels (pages partagées entre processus)
+    return sparse.csr_matrix(tuple(arrays), shape=tuple(shape), copy=False)
+
+
+def _save_postings(directory: Path, prefix: str, postings):
+    indptr, indices = postings
+    np.save(directory / f"{prefix}_postings_indptr.npy", indptr)
+    np.save(directory / f"{prefix}_postings_indices.npy", indices)
+
+
+def _load_postings(directory: Path, prefix: str, mmap_mode: Optional[str]) -> tuple:
+    return tuple(np.load(directory / f"{prefix}_postings_{part}.npy", mmap_mode=mmap_mode) for part in ("indptr", "indices"))
+
+
+def save_index(retr: Retriever, directory, fp: str, retriever_cfg: dict):
+    """Écrit l'index dans `directory` de façon atomique (dossier temporaire puis renommage)."""
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=".tmp_", dir=directory.parent))
+    try:
+        vocab = retr.vectorizer.vocabulary_
+        hashed = isinstance(vocab, HashedVocabulary)
+        if hashed:  # index compact : empreintes triées + colonnes (mappables comme les matrices)
+            hashes, columns = vocab.arrays()
+            np.save(tmp / "vocab_hashes.npy", hashes)
+            np.save(tmp / "vocab_columns.npy", columns)
+        else:
+            with open(tmp / "vocabulary.json", "w", encoding="utf-8") as f:
+                json.dump({term: int(col) for term, col in vocab.items()}, f, ensure_ascii=False)
+        np.save(tmp / "idf.npy", retr.vectorizer.idf_)
+        np.save(tmp / "pruned_hashes.npy", retr._pruned.hashes)
+        meta = {
+            "fingerprint": fp,
+            "format_version": INDEX_FORMAT_VERSION,
+            "retriever": retriever_cfg,
+            "doc_term_shape": _save_csr(tmp, "doc_term", retr.doc_term),
+            "has_keywords": retr.has_keywords,
+            "hashed_vocabulary": hashed,
+        }
+        # listes inversées construites une fois ici : mappées par chaque processus au lieu
+        # d'être recalculées (et recopiées en mémoire privée) à la première recherche
+        terms, kws = retr._inverted_index()
+        _save_postings(tmp, "doc_term", terms)
+        if retr.has_keywords:
+            with open(tmp / "kw_vocabulary.json", "w", encoding="utf-8") as f:
+                json.dump(retr._kw_vocab, f, ensure_ascii=False)
+            np.save(tmp / "kw_len.npy", retr._kw_len)
+            meta["kw_shape"] = _save_csr(tmp, "kw", retr._kw_matrix)
+            _save_postings(tmp, "kw", kws)
+        # meta.json en dernier : sa présence marque un index complet
+        with open(tmp / _META, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            # un autre processus a publié le même index entre-temps
+            shutil.rmtree(tmp, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def load_index(directory, mmap_mode: Optional[str] = "r") -> Retriever:
+    """Recharge un Retriever depuis le disque ; les tableaux CSR sont mappés en mémoire."""
+    directory = Path(directory)
+    with open(directory / _META, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("hashed_vocabulary"):
+        vocab = HashedVocabulary(np.load(directory / "vocab_hashes.npy", mmap_mode=mmap_mode),
+                                 np.load(directory / "vocab_columns.npy", mmap_mode=mmap_mode))
+    else:
+        with open(directory / "vocabulary.json", "r", encoding="utf-8") as f:
+            vocab = json.load(f)
+    idf = np.load(directory / "idf.npy")
+    doc_term = _load_csr(directory, "doc_term", meta["doc_term_shape"], mmap_mode)
+
+    terms = _load_postings(directory, "doc_term", mmap_mode)
+
+    kw_vocab, kw_matrix, kw_len, kws = {}, None, np.zeros(0), None
+    if meta.get("has_keywords"):
+        with open(directory / "kw_vocabulary.json", "r", encoding="utf-8") as f:
+            kw_vocab = json.load(f)
+        kw_len = np.load(directory / "kw_len.npy", mmap_mode=mmap_mode)
+        kw_matrix = _load_csr(directory, "kw", meta["kw_shape"], mmap_mode)
+        kws = _load_postings(directory, "kw", mmap_mode)
+
+    pruned = HashedTermSet(np.load(directory / "pruned_hashes.npy", mmap_mode=mmap_mode))
+    retr = Retriever.from_state(vocab, idf, doc_term, kw_vocab, kw_matrix, kw_len, pruned=pruned,
+                                inverted=(terms, kws), **meta["retriever"])
+    retr.fingerprint = meta["fingerprint"]
+    return retr
+
+
+def load_or_build(faq_path: str, faq_df, index_dir, **retriever_cfg) -> Retriever:
+    """
+    Renvoie le Retriever de `faq_path` : rechargé depuis `index_dir/<empreinte>` si l'index
+    existe, sinon construit (fit TF-IDF) puis persisté. Les anciens index sont supprimés.
+    """
+    fp = fingerprint(faq_path, retriever_cfg)
+    index_dir = Path(index_dir)
+    target = index_dir / fp
+    retr = None
+    if (target / _META).exists():
+        try:
+            retr = load_index(target)
+        except (OSError, ValueError, KeyError):
+            shutil.rmtree(target, ignore_errors=True)  # index corrompu : on reconstruit
+
+    if retr is None:
+        save_index(Retriever(faq_df["index_text"], faq_df, **retriever_cfg), target, fp, retriever_cfg)
+        for old in index_dir.iterdir():
+            if old.is_dir() and old.name != fp and not old.name.startswith(".tmp_"):
+                shutil.rmtree(old, ignore_errors=True)
+        retr = load_index(target)
+    if "id" in faq_df.columns:
+        retr.ids = faq_df["id"].tolist()  # ids des lignes, pour les mises à jour incrémentales
+    return retr
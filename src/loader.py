@@ -1,18 +1,166 @@
+import hashlib
+import io
 import json
+import logging
+import unicodedata
+from pathlib import Path
+from typing import List, Optional, Tuple
+
 import pandas as pd
 
-def load_faq(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    expected = ["id","categorie","question_canonique","variantes","reponse","liens","source","derniere_mise_a_jour"]
-    for col in expected:
-        if col not in df.columns:
-            df[col] = ""
-    df["variantes"] = df["variantes"].fillna("")
-    df["reponse"] = df["reponse"].fillna("")
-    df["question_canonique"] = df["question_canonique"].fillna("")
-    df["index_text"] = (df["question_canonique"].astype(str) + " " + df["variantes"].astype(str) + " " + df["reponse"].astype(str))
+logger = logging.getLogger(__name__)
+
+# ------------ Schéma de la FAQ ------------
+# À incrémenter si la lecture du CSV change (invalide les snapshots, cf. src.snapshot)
+FAQ_LOADER_VERSION = 2
+
+# nom canonique -> noms acceptés dans l'en-tête du CSV (comparés sans casse, accents ni séparateurs)
+FAQ_COLUMNS = {
+    "id": ("id", "identifiant"),
+    "categorie": ("categorie", "category", "intention", "intent"),
+    "question_canonique": ("question_canonique", "question"),
+    "variantes": ("variantes", "variations", "paraphrases"),
+    "reponse": ("reponse", "answer"),
+    "mots_cles": ("mots_cles", "keywords"),
+    "liens": ("liens", "links"),
+    "source": ("source",),
+    "derniere_mise_a_jour": ("derniere_mise_a_jour", "date_maj", "updated_at"),
+}
+REQUIRED_COLUMNS = ("question_canonique", "reponse")
+# Colonnes non créées si absentes : sans 'mots_cles', le retriever n'utilise pas le score mots-clés
+OPTIONAL_COLUMNS = ("mots_cles",)
+
+
+def _header_key(name) -> str:
+    s = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    return "_".join(s.strip().lower().replace("-", " ").split())
+
+
+def _apply_schema(df: pd.DataFrame, source: str) -> pd.DataFrame:
+    """Renomme les colonnes reconnues (alias) en noms canoniques ; les autres sont gardées telles quelles."""
+    found = {}
+    for col in df.columns:
+        key = _header_key(col)
+        for canonical, aliases in FAQ_COLUMNS.items():
+            if key in aliases:
+                if canonical in found:
+                    logger.warning("%s : colonne %r ignorée (%r déjà lue comme %r)", source, col, found[canonical], canonical)
+                else:
+                    found[canonical] = col
+                break
+    df = df.rename(columns={col: canonical for canonical, col in found.items()})
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"colonnes obligatoires absentes de {source} : {missing} (en-tête : {list(found.values()) or list(df.columns)})")
+    return df
+
+
+def parse_faq(raw: bytes, source: str = "FAQ") -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Lit un CSV de FAQ (contenu brut) selon FAQ_COLUMNS -> (DataFrame canonique, anomalies).
+    - colonnes reconnues par alias (ex: 'question' -> 'question_canonique') ; colonnes
+      obligatoires absentes -> ValueError
+    - cellules texte sans valeur -> "" (espaces de bord retirés), ids générés (1..n) si absents
+    - lignes sans question ni réponse ignorées ; réponses ou catégories vides et ids en double
+      signalés dans les anomalies
+    - index_text = question_canonique + variantes + reponse (texte indexé par le retriever)
+    """
+    df = _apply_schema(pd.read_csv(io.BytesIO(raw)), source)
+    issues = []
+    for col in FAQ_COLUMNS:
+        if col == "id" or (col in OPTIONAL_COLUMNS and col not in df.columns):
+            continue
+        df[col] = df[col].fillna("").astype(str).str.strip() if col in df.columns else ""
+    if "id" not in df.columns:
+        df.insert(0, "id", range(1, len(df) + 1))
+
+    empty = (df["question_canonique"] == "") & (df["reponse"] == "")
+    if empty.any():
+        issues.append(f"{int(empty.sum())} ligne(s) sans question ni réponse ignorée(s) : ids {df.loc[empty, 'id'].tolist()}")
+        df = df[~empty].reset_index(drop=True)
+    for col, label in (("reponse", "réponse vide"), ("categorie", "catégorie vide")):
+        bad = df.loc[df[col] == "", "id"].tolist()
+        if bad:
+            issues.append(f"{label} : ids {bad}")
+    dup = df.loc[df["id"].duplicated(keep=False), "id"].unique().tolist()
+    if dup:
+        issues.append(f"ids en double : {dup}")
+
+    df["index_text"] = (df["question_canonique"] + " " + df["variantes"] + " " + df["reponse"])
+    return df, issues
+
+
+def load_faq(path: str, cache=None) -> pd.DataFrame:
+    """
+    FAQ lue depuis le CSV (cf. parse_faq), ou depuis son snapshot si `cache`
+    (src.snapshot.SnapshotCache) en a un pour ce contenu. Les anomalies sont journalisées.
+    """
+    if cache is None:
+        with open(path, "rb") as f:
+            df, issues = parse_faq(f.read(), str(path))
+    else:
+        df, issues = cache.load(path, lambda raw: parse_faq(raw, str(path)), f"faq-v{FAQ_LOADER_VERSION}")
+        entry = cache.report[str(Path(path))]  # même clé que SnapshotCache.load ("./x.csv" -> "x.csv")
+        entry["rows"] = len(df)
+        entry["issues"] = issues
+    for msg in issues:
+        logger.warning("%s : %s", path, msg)
     return df
 
-def load_json(path: str):
+
+def load_json(path: str, cache=None):
+    if cache is not None:
+        return cache.load(path, json.loads, "json")
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
+
+
+# ------------ Réponses (lecture seule, sans pandas) ------------
+def _text_column(df: pd.DataFrame, col: str) -> Tuple[str, ...]:
+    if col not in df.columns:
+        return ("",) * len(df)
+    return tuple(df[col].fillna("").astype(str))
+
+
+def row_content(df: pd.DataFrame) -> list:
+    """(texte indexé, cellule mots_cles ou None) de chaque ligne : ce que l'index dérive d'une ligne."""
+    kws = _text_column(df, "mots_cles") if "mots_cles" in df.columns else (None,) * len(df)
+    return list(zip(_text_column(df, "index_text"), kws))
+
+
+def content_digest(text: str, keywords: Optional[str]) -> int:
+    """Empreinte 64 bits du contenu indexé d'une ligne (détection des lignes modifiées)."""
+    raw = f"{text}\x1f{'' if keywords is None else keywords}\x1f{keywords is None}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "little")
+
+
+class AnswerStore:
+    """
+    Colonnes de la FAQ utiles à la réponse, en tuples (accès O(1) par indice de ligne, sans
+    pandas) : id, catégorie, question et réponse de repli déjà mise en forme
+    (« **question**\\n\\nréponse »), plus l'empreinte du contenu indexé de chaque ligne
+    (mises à jour incrémentales). Le DataFrame peut être libéré une fois l'index construit.
+    """
+
+    __slots__ = ("columns", "ids", "categories", "questions", "fallbacks", "digests")
+
+    def __init__(self, columns, ids, categories, questions, fallbacks, digests):
+        self.columns = tuple(columns)
+        self.ids = tuple(ids)
+        self.categories = tuple(categories)
+        self.questions = tuple(questions)
+        self.fallbacks = tuple(fallbacks)
+        self.digests = tuple(digests)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "AnswerStore":
+        questions = _text_column(df, "question_canonique")
+        fallbacks = [f"**{q}**\n\n{r}" for q, r in zip(questions, _text_column(df, "reponse"))]
+        ids = df["id"].tolist() if "id" in df.columns else range(len(df))
+        return cls(
+            df.columns, ids, (c.strip() for c in _text_column(df, "categorie")), questions, fallbacks,
+            (content_digest(t, k) for t, k in row_content(df)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
@@ -0,0 +1,163 @@
+# src/metrics.py — instrumentation légère : spans perf_counter_ns par étape + histogrammes en mémoire
+import bisect
+import threading
+import time
+from typing import Optional
+
+# Bornes (s) des seaux des histogrammes, comme les histogrammes Prometheus (dernier seau = +Inf)
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+_BUCKETS_NS = tuple(int(b * 1e9) for b in BUCKETS)
+
+# Étapes mesurées par src.engine (dans l'ordre d'exécution)
+STAGES = ("cache", "ner", "tfidf", "scoring", "render", "logging", "total")
+
+
+def percentile(values, p: float) -> float:
+    """Percentile (rang le plus proche) d'une liste de nombres ; 0.0 si vide."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(-(-p * len(ordered) // 100)), 1)  # ceil(p/100 * n)
+    return ordered[rank - 1]
+
+
+class Histogram:
+    """Histogramme à seaux fixes (durées en ns) ; quantiles estimés par interpolation dans le seau."""
+
+    __slots__ = ("counts", "count", "sum_ns")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKETS_NS) + 1)
+        self.count = 0
+        self.sum_ns = 0
+
+    def observe(self, ns: int):
+        self.counts[bisect.bisect_left(_BUCKETS_NS, ns)] += 1
+        self.count += 1
+        self.sum_ns += ns
+
+    def quantile(self, q: float) -> float:
+        """Estimation (s) du quantile q (0..1), comme histogram_quantile() de Prometheus."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if seen + c >= target and c:
+                if i == len(_BUCKETS_NS):  # seau +Inf : on renvoie la plus grande borne finie
+                    return BUCKETS[-1]
+                lower = BUCKETS[i - 1] if i else 0.0
+                return lower + (BUCKETS[i] - lower) * (target - seen) / c
+            seen += c
+        return BUCKETS[-1]
+
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        spans = self.trace.spans
+        spans[self.name] = spans.get(self.name, 0) + time.perf_counter_ns() - self.start
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Trace:
+    """Durées (ns) des étapes d'une requête ; une étape mesurée plusieurs fois est cumulée."""
+
+    __slots__ = ("spans",)
+
+    def __init__(self):
+        self.spans = {}
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def add(self, name: str, ns: int):
+        self.spans[name] = self.spans.get(name, 0) + ns
+
+    def ms(self) -> dict:
+        """{étape: durée en ms} (stockée avec l'interaction)."""
+        return {k: round(v / 1e6, 3) for k, v in self.spans.items()}
+
+
+def span(trace: Optional[Trace], name: str):
+    """trace.span(name), ou un contexte vide si l'appelant ne mesure pas (trace=None)."""
+    return _NO_SPAN if trace is None else _Span(trace, name)
+
+
+class Registry:
+    """Histogrammes par étape, partagés par les threads du processus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self.started_at = time.time()
+
+    def record(self, trace: Trace):
+        with self._lock:
+            for name, ns in trace.spans.items():
+                h = self._histograms.get(name)
+                if h is None:
+                    h = self._histograms[name] = Histogram()
+                h.observe(ns)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def _ordered(self):
+        with self._lock:
+            names = sorted(self._histograms, key=lambda n: (STAGES.index(n) if n in STAGES else len(STAGES), n))
+            return [(n, self._histograms[n]) for n in names]
+
+    def snapshot(self) -> dict:
+        """Vue JSON : nombre, moyenne et p50/p95/p99 (ms) par étape."""
+        out = {}
+        for name, h in self._ordered():
+            out[name] = {
+                "count": h.count,
+                "mean_ms": round(h.sum_ns / h.count / 1e6, 3) if h.count else 0.0,
+                **{f"p{p}_ms": round(h.quantile(p / 100) * 1000, 3) for p in (50, 95, 99)},
+            }
+        return {"uptime_s": round(time.time() - self.started_at, 1), "stages": out}
+
+    def prometheus(self) -> str:
+        """Format texte d'exposition Prometheus (histogramme faq_stage_duration_seconds)."""
+        lines = [
+            "# HELP faq_stage_duration_seconds Durée de chaque étape du pipeline de réponse.",
+            "# TYPE faq_stage_duration_seconds histogram",
+        ]
+        for name, h in self._ordered():
+            cumulative = 0
+            for bound, c in zip(BUCKETS + ("+Inf",), h.counts):
+                cumulative += c
+                lines.append(f'faq_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'faq_stage_duration_seconds_sum{{stage="{name}"}} {h.sum_ns / 1e9:.9f}')
+            lines.append(f'faq_stage_duration_seconds_count{{stage="{name}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+
+# Registre du processus (alimenté par src.engine)
+REGISTRY = Registry()
@@ -1,5 +1,88 @@
 import regex as re
 
+from src.normalizer import default_normalizer
+
+_END = object()                      # marqueur de fin de mot-clé dans le trie
+_WORD = re.compile(r"\w")
+_WORD_START = re.compile(r"(?<!\w)(?=\w)")
+_META = set(".^$*+?{}[]\\|()")
+
+
+def _literal(pattern: str):
+    """
+    Renvoie le texte (en minuscules) d'un motif de la forme \\b<mot(s)>\\b sans métacaractère,
+    ou None si le motif est une vraie expression régulière.
+    """
+    if not (pattern.startswith(r"\b") and pattern.endswith(r"\b")):
+        return None
+    inner = pattern[2:-2]
+    if not inner or any(c in _META or len(c.lower()) != 1 for c in inner):
+        return None
+    if not (_WORD.match(inner[0]) and _WORD.match(inner[-1])):
+        return None
+    return _lower(inner)
+
+
+def _lower(text: str) -> str:
+    """Minuscules en conservant la longueur (donc les positions) du texte."""
+    low = text.lower()
+    if len(low) == len(text):
+        return low
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class KeywordTrie:
+    """
+    Trie de mots-clés parcouru depuis chaque début de mot : le coût d'une recherche dépend
+    de la longueur du texte, pas du nombre de mots-clés.
+    """
+
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def add(self, key: str, value):
+        node = self.root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node.setdefault(_END, []).append(value)
+        self.size += 1
+
+    def matches(self, text: str, starts):
+        """(début, fin, valeurs) de chaque mot-clé présent dans `text` à partir des positions `starts`."""
+        n = len(text)
+        for start in starts:
+            node = self.root
+            j = start
+            while j < n:
+                node = node.get(text[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node:
+                    yield start, j, node[_END]
+
+    def longest_matches(self, text: str, starts, whole_words: bool = False):
+        """
+        Comme matches(), mais garde le plus long mot-clé par position, sans chevauchement.
+        whole_words : seuls les mots-clés suivis d'une frontière de mot comptent (filtrés avant
+        le choix du plus long, pour qu'un mot-clé tronqué ne masque ni un plus court valide au
+        même début, ni les suivants).
+        """
+        n = len(text)
+        best = {}
+        for start, end, values in self.matches(text, starts):
+            if whole_words and end < n and _WORD.match(text, end):
+                continue
+            best[start] = (end, values)  # les fins sont croissantes pour un même début
+        last_end = 0
+        for start in sorted(best):
+            end, values = best[start]
+            if start >= last_end:
+                yield start, end, values
+                last_end = end
+
+
 class RegexNER:
     def __init__(self, ner_schema: dict):
         self.patterns = {}
@@ -15,13 +98,70 @@ class RegexNER:
             if compiled:
                 self.patterns[name] = compiled
 
+        # Gazetteer : entités sans motif, reconnues via leurs exemples (texte normalisé
+        # comme pour le retriever : casse, accents, pluriels), valeur renvoyée = exemple canonique
+        self.normalize = default_normalizer()
+        self._gazetteer = KeywordTrie()
+        for ent in ner_schema.get("entities", []):
+            name = ent.get("name")
+            if name in self.patterns:
+                continue
+            for example in ent.get("examples", []):
+                key = self.normalize(example)
+                if key:
+                    self._gazetteer.add(key, (name, example))
+
+        # Motifs littéraux (\bmot\b) -> trie parcouru en une passe ; les autres restent des regex
+        self._slots = [(name, p) for name, pats in self.patterns.items() for p in pats]
+        self._regex_slots = []
+        self._literals = KeywordTrie()
+        for i, (_, p) in enumerate(self._slots):
+            lit = _literal(p.pattern)
+            if lit is None:
+                self._regex_slots.append(i)
+            else:
+                self._literals.add(lit, i)
+
+    def _scan(self, text: str) -> list:
+        """Correspondances (texte brut) de chaque motif, dans l'ordre de self._slots (comme p.finditer)."""
+        per_slot = [[] for _ in self._slots]
+        for i in self._regex_slots:
+            per_slot[i] = [m.group(0) for m in self._slots[i][1].finditer(text)]
+        if self._literals.size:
+            last_end = {}
+            starts = (m.start() for m in _WORD_START.finditer(text))
+            for start, end, slots in self._literals.matches(_lower(text), starts):
+                if end < len(text) and _WORD.match(text, end):
+                    continue  # pas de frontière de mot après le mot-clé
+                for i in slots:
+                    if start >= last_end.get(i, 0):  # pas de chevauchement pour un même motif
+                        per_slot[i].append(text[start:end])
+                        last_end[i] = end
+        return per_slot
+
+    def _gazetteer_matches(self, text: str):
+        """(entité, exemple canonique) reconnus dans le texte normalisé."""
+        if not self._gazetteer.size or not text:
+            return
+        norm = self.normalize(text)
+        starts = (m.start() for m in _WORD_START.finditer(norm))
+        for _, _, values in self._gazetteer.longest_matches(norm, starts, whole_words=True):
+            yield from values
+
     def extract(self, text: str):
         found = {}
-        for name, pats in self.patterns.items():
-            for p in pats:
-                for m in p.finditer(text or ""):
-                    val = m.group(0)
-                    found.setdefault(name, [])
-                    if val not in found[name]:
-                        found[name].append(val.strip())
+        seen = {}
+
+        def add(name, val):
+            found.setdefault(name, [])
+            name_seen = seen.setdefault(name, set())
+            if val not in name_seen:
+                name_seen.add(val)
+                found[name].append(val)
+
+        for (name, _), matches in zip(self._slots, self._scan(text or "")):
+            for val in matches:
+                add(name, val.strip())
+        for name, example in self._gazetteer_matches(text or ""):
+            add(name, example)
         return found
@@ -0,0 +1,74 @@
+# src/normalizer.py
+import json
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / "data" / "normalisation_uvbf.json"
+
+
+@lru_cache(maxsize=None)
+def _strip_accents_table() -> dict:
+    """Table str.translate supprimant tous les caractères combinants (construite une seule fois)."""
+    return {c: None for c in range(sys.maxunicode + 1) if unicodedata.combining(chr(c))}
+
+
+class Normalizer:
+    """
+    Normaliseur de texte piloté par un fichier de règles (ex: data/normalisation_uvbf.json).
+    - "pluriels"  : formes singulières ; « mot » et « mots » (mot entier) -> « mot »
+    - "variantes" : {"pattern": regex, "replacement": texte}, appliquées sur des mots entiers
+    Toutes les règles sont compilées une seule fois en une alternance unique, avec une table
+    de remplacement ; elles doivent porter sur des mots distincts (pas de chevauchement).
+    """
+
+    def __init__(self, rules: dict):
+        alternatives = []
+        self._plural_table = {}
+        plurals = [w for w in rules.get("pluriels", []) if w]
+        if plurals:
+            for w in plurals:
+                self._plural_table[w] = w
+                self._plural_table[w + "s"] = w
+            alternatives.append("(?P<pluriel>" + "|".join(re.escape(w) + "s?" for w in plurals) + ")")
+
+        self._variant_replacements = []
+        for i, v in enumerate(rules.get("variantes", [])):
+            alternatives.append(f"(?P<v{i}>{v['pattern']})")
+            self._variant_replacements.append(v["replacement"])
+
+        self._rules_re = re.compile(r"\b(?:" + "|".join(alternatives) + r")\b") if alternatives else None
+        self._spaces_re = re.compile(r"[\s_/]+")
+
+    @classmethod
+    def from_json(cls, path: Optional[str] = None) -> "Normalizer":
+        with open(path or DEFAULT_RULES_PATH, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _replace(self, m) -> str:
+        group = m.lastgroup
+        if group == "pluriel":
+            return self._plural_table[m.group()]
+        return self._variant_replacements[int(group[1:])]
+
+    def __call__(self, text: str) -> str:
+        if not isinstance(text, str):
+            return ""
+        t = text.lower()
+        # enlever accents (inutile si le texte est déjà ASCII)
+        if not t.isascii():
+            t = unicodedata.normalize("NFKD", t).translate(_strip_accents_table())
+        # pluriels -> singuliers + variantes d'écriture, en une seule passe
+        if self._rules_re is not None:
+            t = self._rules_re.sub(self._replace, t)
+        # nettoyages : '_' et '/' -> espace, espaces multiples -> un seul
+        return self._spaces_re.sub(" ", t).strip()
+
+
+@lru_cache(maxsize=None)
+def default_normalizer() -> Normalizer:
+    """Normaliseur partagé (règles de data/normalisation_uvbf.json), utilisé par le retriever et la NER."""
+    return Normalizer.from_json()
@@ -0,0 +1,377 @@
+# src/pipeline.py — pipeline FAQ (données + NER + retriever + templates) partagé par processus
+import logging
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import yaml
+
+from src.cache import QueryCache
+from src.index_store import load_or_build
+from src.loader import AnswerStore, content_digest, load_faq, load_json, row_content
+from src.metrics import REGISTRY
+from src.ner import RegexNER
+from src.normalizer import DEFAULT_RULES_PATH
+from src.sharding import ShardedRetriever
+from src.snapshot import SnapshotCache
+from src.templates import ENTITY_KEYS, TemplateManager
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve(base_dir: Path, path) -> Path:
+    path = Path(path)
+    return path if path.is_absolute() else base_dir / path
+
+
+def _spread(items, n: int) -> list:
+    """Au plus `n` éléments de `items` : le premier, le dernier et d'autres régulièrement espacés."""
+    if n <= 0:
+        return []
+    if len(items) <= n:
+        return list(items)
+    if n == 1:
+        return [items[0]]
+    step = (len(items) - 1) / (n - 1)
+    return [items[round(i * step)] for i in range(n)]
+
+
+def _files_signature(paths) -> tuple:
+    """(chemin, mtime_ns, taille) de chaque fichier surveillé ; change dès qu'un fichier est modifié."""
+    sig = []
+    for p in paths:
+        try:
+            st = p.stat()
+            sig.append((str(p), st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append((str(p), None, None))
+    return tuple(sig)
+
+
+class Pipeline:
+    """
+    Ensemble des objets nécessaires à answer(), construits une fois à partir de config.yaml.
+    Un Pipeline n'est jamais modifié après construction : un rechargement en crée un nouveau
+    (cf. PipelineReloader), les requêtes en cours terminent sur l'ancien.
+    - load_metrics : durée (s) de chaque étape de chargement + total
+    - load_report  : par fichier de données lu, source (snapshot ou analyse), durée, taille,
+                     et pour la FAQ nombre de lignes et anomalies (cf. src.loader.parse_faq)
+    - version      : numéro du snapshot (incrémenté à chaque rechargement publié)
+    - index_update : comment l'index a été obtenu (full, reused, incremental + nb de lignes)
+    - answers      : colonnes de la FAQ utiles à la réponse (AnswerStore, dans l'ordre de l'index) ;
+                     le DataFrame lu n'est pas conservé
+    `previous` : snapshot précédent (rechargement) ; NER, templates et index dont les fichiers
+    n'ont pas changé sont réutilisés, et une modification du seul CSV est appliquée à l'index
+    ligne par ligne (Retriever.apply_changes) tant que la dérive d'IDF reste sous
+    retriever.idf_refresh_drift.
+    """
+
+    def __init__(self, base_dir, config_path="config.yaml", previous: Optional["Pipeline"] = None):
+        self.base_dir = Path(base_dir)
+        self.config_path = _resolve(self.base_dir, config_path)
+        self.load_metrics = {}
+        t_start = time.perf_counter()
+
+        t0 = time.perf_counter()
+        with open(self.config_path, "r", encoding="utf-8") as f:
+            self.cfg = yaml.safe_load(f)
+        self.load_metrics["config"] = time.perf_counter() - t0
+
+        data_cfg = self.cfg["data"]
+        self.faq_path = _resolve(self.base_dir, data_cfg["faq_csv"])
+        self.ner_path = _resolve(self.base_dir, data_cfg["ner_json"])
+        self.templates_path = _resolve(self.base_dir, data_cfg["templates_json"])
+        # Signature prise avant la lecture des données : une modification pendant la
+        # construction sera vue comme un nouveau changement.
+        self.signature = _files_signature(self.watched_files())
+        self.version = 1
+        unchanged = set()
+        if previous is not None and previous.cfg == self.cfg:
+            unchanged = {path for path, *_ in set(self.signature) & set(previous.signature)}
+
+        # Fichiers déjà analysés : rechargés depuis leur snapshot si leur contenu n'a pas changé
+        snapshot_dir = data_cfg.get("snapshot_dir", "data/cache")
+        snapshots = SnapshotCache(_resolve(self.base_dir, snapshot_dir) if snapshot_dir else None)
+        self.load_report = snapshots.report
+
+        t0 = time.perf_counter()
+        faq = load_faq(self.faq_path, snapshots)
+        self.load_metrics["faq_csv"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        if str(self.ner_path) in unchanged:
+            self.ner = previous.ner  # objets en lecture seule : partagés entre snapshots
+        else:
+            self.ner = RegexNER(load_json(self.ner_path, snapshots))
+        self.load_metrics["ner"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        if str(self.templates_path) in unchanged:
+            self.tm = previous.tm
+        else:
+            self.tm = TemplateManager(load_json(self.templates_path, snapshots))
+        self.load_metrics["templates"] = time.perf_counter() - t0
+
+        retr_cfg = self.cfg.get("retriever", {})
+        nr = retr_cfg.get("ngram_range", (1, 2))
+        if isinstance(nr, list): nr = (int(nr[0]), int(nr[1]))
+        self.top_k = int(retr_cfg.get("top_k", 3))
+
+        index_cfg = dict(
+            ngram_range=nr,
+            min_df=retr_cfg.get("min_df", 1),
+            max_df=retr_cfg.get("max_df", 0.95),
+            keyword_weight=float(retr_cfg.get("keyword_weight", 0.30)),  # ajuste 0.2–0.4 (python -m benchmarks.eval --sweep)
+            threshold=float(retr_cfg.get("threshold", 0.0)),             # optionnel
+            candidate_ratio=float(retr_cfg.get("candidate_ratio", 0.10)), # index inversé (0 = score complet)
+            max_features=retr_cfg.get("max_features"),                   # élagage du vocabulaire (None = tout)
+            compact=bool(retr_cfg.get("compact", False))                  # float32 + vocabulaire haché
+        )
+
+        # Index persisté (memmap) : reconstruit seulement si le CSV ou la config changent
+        t0 = time.perf_counter()
+        self.retr = None
+        if str(DEFAULT_RULES_PATH) in unchanged:
+            if str(self.faq_path) in unchanged:
+                self.retr, self.answers = previous.retr, previous.answers
+                self.index_update = {"mode": "reused"}
+            else:
+                self.retr = self._update_index(previous, faq, float(retr_cfg.get("idf_refresh_drift", 0.05)))
+        if self.retr is None:
+            self.retr = load_or_build(
+                self.faq_path,
+                faq,                       # ✅ on passe le DataFrame pour utiliser 'mots_cles'
+                _resolve(self.base_dir, retr_cfg.get("index_dir", "data/index")),
+                **index_cfg
+            )
+            self.answers = AnswerStore.from_frame(faq)  # le DataFrame n'est plus conservé ensuite
+            self.index_update = {"mode": "full"}
+        # Gros corpus : recherche répartie sur un pool de processus (retriever.shards > 1)
+        shards = int(retr_cfg.get("shards", 0) or 0)
+        if shards > 1 and not isinstance(self.retr, ShardedRetriever):
+            self.retr = ShardedRetriever(self.retr, shards)
+        self.load_metrics["retriever"] = time.perf_counter() - t0
+
+        # Cache des résultats de recherche (NER et rendu refaits par requête) : propre à ce pipeline, donc vidé à chaque reconstruction
+        cache_cfg = self.cfg.get("cache", {})
+        self.cache = QueryCache(
+            maxsize=int(cache_cfg.get("maxsize", 1024)),
+            ttl=cache_cfg.get("ttl_seconds", 600),
+        )
+
+        self.load_metrics["total"] = time.perf_counter() - t_start
+        self.built_at = datetime.now()
+
+    def _update_index(self, previous: "Pipeline", new, max_drift: float):
+        """
+        Retriever du snapshot précédent + lignes ajoutées / modifiées / supprimées (par id) du
+        nouveau CSV `new`, sans réapprendre tout l'index ; self.answers suit l'ordre de l'index.
+        Les lignes modifiées sont repérées par l'empreinte de leur contenu indexé (AnswerStore).
+        None (=> reconstruction complète) si les ids ne le permettent pas, si plus de la moitié
+        des lignes changent ou si la dérive d'IDF dépasse max_drift.
+        """
+        old = previous.answers
+        if ("id" not in new.columns or new["id"].duplicated().any()
+                or ("mots_cles" in old.columns) != ("mots_cles" in new.columns)
+                or previous.retr.ids != list(old.ids)):
+            return None
+
+        before = dict(zip(old.ids, old.digests))
+        after = dict(zip(new["id"].tolist(), row_content(new)))
+        deletes = [i for i in before if i not in after]
+        upserts = {i: v for i, v in after.items() if before.get(i) != content_digest(*v)}
+        if len(deletes) + len(upserts) > len(new) // 2:
+            return None
+
+        retr = previous.retr.copy()
+        drift = retr.apply_changes(upserts, deletes)
+        if drift > max_drift:
+            return None
+        retr.fingerprint = f"{previous.retr.fingerprint.split('+')[0]}+{previous.version + 1}"  # index en mémoire seulement
+        self.answers = AnswerStore.from_frame(new.set_index("id", drop=False).loc[retr.ids].reset_index(drop=True))
+        self.index_update = {"mode": "incremental", "upserts": len(upserts), "deletes": len(deletes),
+                             "idf_drift": round(drift, 6)}
+        return retr
+
+    def watched_files(self):
+        return [self.config_path, self.faq_path, self.ner_path, self.templates_path, DEFAULT_RULES_PATH]
+
+    def is_stale(self) -> bool:
+        return _files_signature(self.watched_files()) != self.signature
+
+    def validate(self, sample: Optional[int] = None):
+        """
+        Vérifie qu'un snapshot est utilisable avant de le publier ; lève ValueError sinon.
+        Un échantillon borné de questions de la FAQ (`sample`, par défaut reload.validate_sample :
+        premières, dernières et régulièrement espacées entre les deux) est rejoué (NER + une
+        seule recherche par lot) et chaque template est rendu avec toutes les entités renseignées.
+        Recherche répartie : le lot passe par le Retriever enveloppé (mêmes résultats), pour ne
+        pas démarrer de pool ici (ex: processus parent du serveur, avant le fork des workers).
+        """
+        answers = self.answers
+        if not len(answers):
+            raise ValueError(f"FAQ vide : {self.faq_path}")
+        missing = [c for c in ("question_canonique", "reponse", "categorie") if c not in answers.columns]
+        if missing:
+            raise ValueError(f"colonnes manquantes dans {self.faq_path} : {missing}")
+        n_docs = self.retr.doc_term.shape[0]
+        if n_docs != len(answers):
+            raise ValueError(f"index de {n_docs} documents pour {len(answers)} lignes de FAQ")
+        if sample is None:
+            sample = int(self.cfg.get("reload", {}).get("validate_sample", 200))
+        questions = _spread(answers.questions, sample)
+        for q in questions:
+            self.ner.extract(q)
+        retr = self.retr.base if isinstance(self.retr, ShardedRetriever) else self.retr
+        for q, hits in zip(questions, retr.search_batch(questions, top_k=self.top_k)):
+            for idx, _ in hits:
+                if not 0 <= idx < len(answers):
+                    raise ValueError(f"résultat hors index ({idx}) pour {q!r}")
+        probe = {k: [k.lower()] for k in ENTITY_KEYS}
+        for intent in self.tm.templates:
+            try:
+                self.tm.render(intent, probe)
+            except (KeyError, IndexError, ValueError) as e:
+                raise ValueError(f"template {intent!r} invalide : {type(e).__name__}: {e}") from e
+
+
+# --------- Rechargement à chaud ----------
+class PipelineReloader:
+    """
+    Snapshot courant d'un pipeline + thread de surveillance des fichiers (config, FAQ, NER,
+    templates, règles de normalisation ; sondage mtime/taille toutes les `interval` s).
+    Quand un fichier change (et n'a plus bougé depuis un sondage), un nouveau Pipeline est
+    construit en arrière-plan, validé, puis publié par simple réassignation de `current` :
+    les requêtes en cours gardent leur référence à l'ancien snapshot. Un snapshot invalide
+    n'est jamais publié ; il n'est retenté qu'à la modification suivante.
+    """
+
+    def __init__(self, base_dir, config_path="config.yaml", interval: Optional[float] = None):
+        self.base_dir = base_dir
+        self.config_path = config_path
+        self.current = Pipeline(base_dir, config_path)
+        self.current.validate()
+        # par défaut : reload.interval_seconds de config.yaml (0 = pas de surveillance)
+        self.interval = float(self.current.cfg.get("reload", {}).get("interval_seconds", 2.0)) if interval is None else interval
+        self.stats = {
+            "version": self.current.version,
+            "reloads": 0,
+            "failures": 0,
+            "last_reload_seconds": round(self.current.load_metrics["total"], 4),
+            "last_reload_at": self.current.built_at.isoformat(timespec="seconds"),
+            "last_error": None,
+        }
+        self._reload_lock = threading.Lock()
+        self._pending = None           # signature vue au sondage précédent (anti-écriture partielle)
+        self._failed_signature = None  # signature dont la construction a échoué
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- Surveillance ----
+    def start(self):
+        """Démarre le thread de surveillance (à nouveau si besoin, ex: après un fork)."""
+        if self.interval and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="pipeline-reloader", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Échec de la surveillance des fichiers du pipeline")
+
+    def check(self) -> bool:
+        """Recharge si les fichiers ont changé et sont stables depuis le dernier appel."""
+        sig = _files_signature(self.current.watched_files())
+        if sig == self.current.signature or sig == self._failed_signature:
+            self._pending = None
+            return False
+        if sig != self._pending:  # modification en cours : on attend le sondage suivant
+            self._pending = sig
+            return False
+        return self.reload()
+
+    # ---- Reconstruction ----
+    def reload(self) -> bool:
+        """Construit, valide et publie un nouveau snapshot ; False (ancien conservé) en cas d'échec."""
+        with self._reload_lock:
+            t0 = time.perf_counter()
+            try:
+                new = Pipeline(self.base_dir, self.config_path, previous=self.current)
+                new.validate()
+            except Exception as e:
+                self._failed_signature = _files_signature(self.current.watched_files())
+                self.stats["failures"] += 1
+                self.stats["last_error"] = f"{datetime.now().isoformat(timespec='seconds')} {type(e).__name__}: {e}"
+                logger.exception("Rechargement du pipeline refusé, version %d conservée", self.current.version)
+                return False
+            new.version = self.current.version + 1
+            self.current = new  # publication atomique (réassignation d'une référence)
+            self._pending = self._failed_signature = None
+            self.stats.update({
+                "version": new.version,
+                "reloads": self.stats["reloads"] + 1,
+                "last_reload_seconds": round(time.perf_counter() - t0, 4),
+                "last_reload_at": new.built_at.isoformat(timespec="seconds"),
+            })
+            logger.info("Pipeline rechargé (version %d, %.2f s)", new.version, self.stats["last_reload_seconds"])
+            return True
+
+
+# --------- Snapshot partagé par processus ----------
+_lock = threading.Lock()
+_reloaders = {}    # (base_dir, config_path) -> PipelineReloader
+_stats = {"builds": 0, "reuses": 0}
+
+
+def get_pipeline(base_dir, config_path="config.yaml", watch: bool = True) -> Pipeline:
+    """
+    Snapshot courant du pipeline, partagé par toutes les sessions du processus. Construit au
+    premier appel ; ensuite un thread le reconstruit en arrière-plan quand config.yaml ou un
+    fichier de données change (reload.interval_seconds, 0 = désactivé), sans bloquer les requêtes.
+    watch=False : pas de thread (ex: processus parent avant fork).
+    """
+    key = (str(base_dir), str(config_path))
+    with _lock:
+        reloader = _reloaders.get(key)
+        if reloader is None:
+            reloader = PipelineReloader(base_dir, config_path)
+            _reloaders[key] = reloader
+            _stats["builds"] += 1
+        else:
+            _stats["reuses"] += 1
+    if watch:
+        reloader.start()
+    return reloader.current
+
+
+def _reloader_of(pipe: Pipeline):
+    return next((r for r in _reloaders.values() if Path(r.current.config_path) == pipe.config_path), None)
+
+
+def pipeline_metrics(pipe: Pipeline) -> dict:
+    """Métriques de chargement exposées au tableau de bord."""
+    reloader = _reloader_of(pipe)
+    return {
+        "version": pipe.version,
+        "built_at": pipe.built_at.isoformat(timespec="seconds"),
+        "load_seconds": {k: round(v, 4) for k, v in pipe.load_metrics.items()},
+        "assets": pipe.load_report,           # snapshot ou analyse, durée par fichier
+        "index_update": pipe.index_update,
+        "reload": dict(reloader.stats) if reloader else None,
+        "builds": _stats["builds"],
+        "reuses": _stats["reuses"],
+        "index_fingerprint": pipe.retr.fingerprint,
+        "index_memory": pipe.retr.memory_usage(),  # octets par partie de l'index
+        "query_cache": pipe.cache.stats(),
+        "latency": REGISTRY.snapshot(),   # histogrammes par étape de ce processus
+    }
@@ -1,45 +1,23 @@
 # src/retriever.py
 import re
-import unicodedata
-from typing import Iterable, List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
+from scipy import sparse
+
+from src.metrics import span
+from src.normalizer import default_normalizer
+from src.tfidf import TOKEN_PATTERN, QueryVectorizer
+from src.vocabulary import HashedTermSet, HashedVocabulary, dict_nbytes
 
 
 # ------------ Normalisation ------------
+# Règles (pluriels, variantes d'écriture) chargées depuis data/normalisation_uvbf.json
+_NORMALIZER = default_normalizer()
+
+
 def _normalize(text: str) -> str:
-    if not isinstance(text, str):
-        return ""
-    t = text.lower()
-    # enlever accents
-    t = ''.join(c for c in unicodedata.normalize('NFKD', t) if not unicodedata.combining(c))
-    # pluriels -> singuliers (règles simples domaine)
-    rules = [
-        (r"\bexamens?\b", "examen"),
-        (r"\bevaluations?\b", "evaluation"),
-        (r"\bformations?\b", "formation"),
-        (r"\bprogrammes?\b", "programme"),
-        (r"\bfilieres?\b", "filiere"),
-        (r"\bsessions?\b", "session"),
-        (r"\bdiplomes?\b", "diplome"),
-        (r"\bnotes?\b", "note"),
-        (r"\bmodalites?\b", "modalite"),
-        (r"\bidentifiants?\b", "identifiant"),
-        (r"\bmasters?\b", "master"),
-        (r"\blicences?\b", "licence"),
-        (r"\bproblemes?\b", "probleme"),
-        (r"\bdifficultes?\b", "difficulte"),
-    ]
-    for pat, rep in rules:
-        t = re.sub(pat, rep, t)
-    # variantes d'écriture
-    t = re.sub(r"\buv[\-\s]?bf\b", "uvbf", t)
-    t = re.sub(r"\bmdp\b", "mot de passe", t)
-    # nettoyages
-    t = re.sub(r"[_/]", " ", t)
-    t = re.sub(r"\s+", " ", t).strip()
-    return t
+    return _NORMALIZER(text)
 
 
 def _tokenize(text: str) -> List[str]:
@@ -69,19 +47,194 @@ def _keyword_list(cell) -> List[str]:
     return list(dict.fromkeys(out))
 
 
-def _keyword_overlap_score(query_tokens: List[str], kw_norm_list: List[str]) -> float:
+def _keyword_matrix(kw_lists: List[List[str]], dtype=np.float64) -> Tuple[dict, "sparse.csr_matrix", np.ndarray]:
+    """
+    Construit la matrice d'incidence (docs x mots-clés) à partir des listes normalisées.
+    Renvoie (vocabulaire mot-clé -> colonne, matrice CSR binaire, nb de mots-clés par ligne).
+    Le score de recouvrement d'une ligne vaut alors (K @ q)[i] / nb_mots_cles[i].
+    """
+    vocab: dict = {}
+    indptr = [0]
+    indices: List[int] = []
+    for kws in kw_lists:
+        for k in kws:
+            indices.append(vocab.setdefault(k, len(vocab)))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=dtype)
+    mat = sparse.csr_matrix(
+        (data, np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(kw_lists), len(vocab)),
+    )
+    lengths = np.diff(mat.indptr).astype(dtype)
+    return vocab, mat, lengths
+
+
+def _select_top_k(scores: np.ndarray, top_k: int, threshold: float) -> List[Tuple[int, float]]:
+    """
+    Sélection partielle des top_k meilleurs scores >= threshold, sans trier tout le corpus.
+    Ordre : score décroissant, puis indice croissant en cas d'égalité
+    (identique à un tri stable décroissant de toutes les lignes).
+    """
+    if top_k <= 0:
+        return []
+    cand = np.flatnonzero(scores >= threshold)
+    if cand.size > top_k:
+        vals = scores[cand]
+        kth = np.partition(vals, vals.size - top_k)[vals.size - top_k]  # k-ième plus grand score
+        above = cand[vals > kth]
+        ties = cand[vals == kth][: top_k - above.size]  # ex-aequo : plus petits indices d'abord
+        cand = np.concatenate([above, ties])
+    order = cand[np.argsort(-scores[cand], kind="stable")]
+    return [(int(i), float(scores[i])) for i in order]
+
+
+def _pad_with_zeros(hits: List[Tuple[int, float]], top_k: int, n_docs: int) -> List[Tuple[int, float]]:
     """
-    Proportion de mots-clés présents dans la requête.
-    nb_matches / nb_keywords (0..1). Si pas de mots-clés, renvoie 0.
+    Complète `hits` (scores > 0) par des lignes de score nul, plus petits indices d'abord :
+    ce que renvoie le score complet quand threshold <= 0 et que peu de lignes matchent.
     """
-    if not kw_norm_list:
-        return 0.0
-    qset = set(query_tokens)
-    matches = sum(1 for k in kw_norm_list if k in qset)
-    return matches / len(kw_norm_list)
+    taken = {i for i, _ in hits}
+    i = 0
+    while len(hits) < top_k and i < n_docs:
+        if i not in taken:
+            hits.append((i, 0.0))
+        i += 1
+    return hits
+
+
+# ------------ Index inversé ------------
+def _postings(mat) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Listes inversées (colonne -> lignes non nulles, triées) d'une matrice CSR : (indptr, indices).
+    Sans copie CSC de la matrice (ni de ses valeurs) : tri stable des seuls indices de colonnes.
+    """
+    n_rows, n_cols = mat.shape
+    rows = np.repeat(np.arange(n_rows, dtype=np.int32), np.diff(mat.indptr))
+    order = np.argsort(mat.indices, kind="stable")  # lignes croissantes dans chaque colonne
+    indptr = np.zeros(n_cols + 1, dtype=np.int64)
+    np.cumsum(np.bincount(mat.indices, minlength=n_cols), out=indptr[1:])
+    return indptr, rows[order]
+
+
+# ------------ Mises à jour incrémentales ------------
+def _smooth_idf(df: np.ndarray, n_docs: int) -> np.ndarray:
+    """IDF lissé de TfidfVectorizer (smooth_idf=True) : ln((1 + n) / (1 + df)) + 1."""
+    return np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+
+
+def _splice_rows(mat, replaced: Dict[int, "sparse.csr_matrix"], removed: List[int], appended, n_cols: int):
+    """
+    Nouvelle matrice CSR : lignes `replaced` {position: ligne 1 x n} substituées, positions
+    `removed` retirées, lignes `appended` ajoutées à la fin. Les blocs inchangés sont recopiés
+    d'un seul tenant (O(nnz) + O(nb de lignes modifiées)).
+    """
+    data, indices, lengths = [], [], []
+    indptr = mat.indptr
+
+    def keep(lo, hi):  # bloc inchangé [lo, hi)
+        data.append(mat.data[indptr[lo]:indptr[hi]])
+        indices.append(mat.indices[indptr[lo]:indptr[hi]])
+        lengths.append(np.diff(indptr[lo:hi + 1]))
+
+    start = 0
+    for pos in sorted(set(replaced) | set(removed)):
+        keep(start, pos)
+        row = replaced.get(pos)
+        if row is not None:
+            data.append(row.data)
+            indices.append(row.indices)
+            lengths.append(np.asarray([row.nnz]))
+        start = pos + 1
+    keep(start, mat.shape[0])
+    if appended is not None:
+        data.append(appended.data)
+        indices.append(appended.indices)
+        lengths.append(np.diff(appended.indptr))
+
+    new_indptr = np.concatenate([[0], np.cumsum(np.concatenate(lengths))])
+    return _csr(np.concatenate(data).astype(mat.dtype, copy=False), np.concatenate(indices), new_indptr,
+                (len(new_indptr) - 1, n_cols))
+
+
+# ------------ Index compact ------------
+def _csr(data, indices, indptr, shape):
+    """CSR sans conversion implicite : indices et indptr en int32 tant que nnz et n_cols le permettent."""
+    small = max(len(data), shape[1]) < 2 ** 31
+    index_dtype = np.int32 if small else np.int64
+    mat = sparse.csr_matrix(shape, dtype=data.dtype)
+    mat.data = data
+    mat.indices = np.asarray(indices, dtype=index_dtype)
+    mat.indptr = np.asarray(indptr, dtype=index_dtype)
+    return mat
+
+
+def _compact_csr(mat):
+    """Copie float32 / int32 d'une matrice CSR (moitié moins de mémoire pour les valeurs)."""
+    mat = sparse.csr_matrix(mat)
+    return _csr(mat.data.astype(np.float32), mat.indices, mat.indptr, mat.shape)
+
+
+def _csr_nbytes(mat) -> int:
+    return 0 if mat is None else int(mat.data.nbytes + mat.indices.nbytes + mat.indptr.nbytes)
 
 
 # ------------ Retriever ------------
+# Taille maximale (en cellules) de la matrice dense de scores d'un paquet de search_batch
+_BATCH_CELLS = 4_000_000
+
+
+def _fused_scores(doc_term, q_vecs, keyword_weight: float = 0.0, kw_matrix=None, kw_len=None, q_kw=None) -> np.ndarray:
+    """
+    Scores (requêtes x docs) : cosinus TF-IDF, fusionné si q_kw est fourni avec la proportion
+    de mots-clés de chaque ligne présents dans la requête (nb_matches / nb_keywords, 0 si la
+    ligne n'a pas de mots-clés). Fonctionne aussi sur un bloc de lignes (cf. src.sharding).
+    """
+    # Lignes TF-IDF déjà normalisées L2 : le cosinus est un simple produit creux.
+    # On calcule docs x requêtes (seules les requêtes sont transposées/converties),
+    # pour ne jamais recopier la matrice doc-terme (éventuellement memmap).
+    final = (doc_term @ q_vecs.T).T.toarray()
+    if q_kw is not None:
+        matches = (kw_matrix @ q_kw.T).T.toarray()
+        kw_scores = np.divide(matches, kw_len, out=np.zeros_like(matches), where=kw_len > 0)
+        final = (1.0 - keyword_weight) * final + keyword_weight * kw_scores
+    return final
+
+
+def _make_vectorizer(ngram_range: tuple, min_df, max_df, max_features=None, dtype=np.float64):
+    """TfidfVectorizer à apprendre ; scikit-learn n'est importé que pour construire un index."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    return TfidfVectorizer(
+        ngram_range=tuple(ngram_range),
+        min_df=min_df,
+        max_df=max_df,
+        max_features=max_features,
+        dtype=dtype,
+        preprocessor=_normalize,
+        token_pattern=TOKEN_PATTERN
+    )
+
+
+def _pruned_terms(fitted, docs: list) -> HashedTermSet:
+    """
+    Termes des documents écartés du vocabulaire appris (max_df, min_df, max_features) : les
+    mises à jour incrémentales ne doivent pas les réintroduire avec des fréquences partielles.
+    """
+    if fitted.min_df == 1 and fitted.max_df == 1.0 and fitted.max_features is None:
+        return HashedTermSet()  # aucun élagage
+    analyzer, vocab = fitted.build_analyzer(), fitted.vocabulary_
+    return HashedTermSet.from_terms({t for doc in docs for t in analyzer(doc) if t not in vocab})
+
+
+def _fitted_vectorizer(ngram_range: tuple, min_df, max_df, vocabulary, idf: np.ndarray,
+                       max_features=None) -> QueryVectorizer:
+    """
+    Vectoriseur de requêtes à partir d'un vocabulaire (dict ou HashedVocabulary) et d'un IDF
+    existants (sans apprentissage ni scikit-learn) ; vecteurs dans le type de l'IDF.
+    """
+    return QueryVectorizer(vocabulary, idf, _normalize, ngram_range, min_df, max_df, max_features)
+
+
 class Retriever:
     def __init__(
         self,
@@ -91,7 +244,10 @@ class Retriever:
         min_df: int = 1,
         max_df: float = 0.95,
         keyword_weight: float = 0.30,  # 30% mots-clés par défaut
-        threshold: float = 0.0         # seuil minimal sur le score final
+        threshold: float = 0.0,        # seuil minimal sur le score final
+        candidate_ratio: float = 0.10, # part max. du corpus scorée via l'index inversé
+        max_features: Optional[int] = None,  # élagage : n termes les plus fréquents
+        compact: bool = False          # float32 / int32 + vocabulaire haché
     ):
         """
         Retriever TF-IDF + cosinus, avec score optionnel de recouvrement des mots-clés.
@@ -99,54 +255,376 @@ class Retriever:
         - faq_df     : DataFrame contenant au moins la colonne 'mots_cles'
         - keyword_weight : poids du score mots-clés (0..1). Si faq_df=None => ignoré
         - threshold  : filtre les résultats dont le score final < threshold
+        - candidate_ratio : seules les lignes partageant un terme ou un mot-clé avec la requête
+          sont scorées (index inversé), tant qu'elles représentent au plus cette part du
+          corpus ; au-delà (ou si 0), toutes les lignes sont scorées. Résultats identiques.
+        - min_df / max_features : élagage du vocabulaire (fréquence documentaire minimale,
+          ou n termes les plus fréquents) ; les bigrammes vus une seule fois en sont l'essentiel
+        - compact    : valeurs float32, indices int32 et vocabulaire haché (HashedVocabulary)
+          au lieu du dict de chaînes ; scores identiques à ~1e-7 près (cf. memory_usage())
         """
         self.has_keywords = faq_df is not None and "mots_cles" in faq_df.columns
         self.keyword_weight = float(keyword_weight if self.has_keywords else 0.0)
         self.threshold = float(threshold)
+        self.candidate_ratio = float(candidate_ratio)
+        self._inverted = None  # listes inversées (persistées avec l'index, sinon construites à la première recherche)
+        self.fingerprint: Optional[str] = None  # renseignée quand l'index est persisté (src.index_store)
 
         # TF-IDF avec normalisation via preprocessor
-        self.vectorizer = TfidfVectorizer(
-            ngram_range=ngram_range,
-            min_df=min_df,
-            max_df=max_df,
-            preprocessor=_normalize,
-            token_pattern=r"(?u)\b\w+\b"
-        )
-        self.doc_term = self.vectorizer.fit_transform(docs)
+        self.compact = bool(compact)
+        dtype = np.float32 if self.compact else np.float64
+        docs = list(docs)
+        fitted = _make_vectorizer(ngram_range, min_df, max_df, max_features, dtype)
+        self.doc_term = fitted.fit_transform(docs)
+        vocabulary = fitted.vocabulary_
+        self._pruned = _pruned_terms(fitted, docs)
+        if self.compact:
+            self.doc_term = _compact_csr(self.doc_term)
+            vocabulary = HashedVocabulary.from_dict(vocabulary)
+        # seul le vocabulaire et l'IDF servent ensuite : plus d'objet scikit-learn dans l'index
+        self.vectorizer = _fitted_vectorizer(ngram_range, min_df, max_df, vocabulary, fitted.idf_, max_features)
+        self._df = None  # fréquences documentaires (calculées à la première mise à jour)
+
+        # id de chaque ligne (colonne 'id' de la FAQ, sinon position) pour add/update/delete
+        if faq_df is not None and "id" in faq_df.columns:
+            self.ids = faq_df["id"].tolist()
+        else:
+            self.ids = list(range(self.doc_term.shape[0]))
 
-        # Si on a le DF, pré-calculer les mots-clés normalisés
-        self._kw_lists: List[List[str]] = []
+        # Si on a le DF, pré-calculer la matrice d'incidence des mots-clés normalisés
+        self._kw_vocab: dict = {}
+        self._kw_matrix = None
+        self._kw_len = np.zeros(0)
         if self.has_keywords:
-            self._kw_lists = [_keyword_list(faq_df.loc[i, "mots_cles"]) for i in range(len(faq_df))]
+            kw_lists = [_keyword_list(faq_df.loc[i, "mots_cles"]) for i in range(len(faq_df))]
+            self._kw_vocab, self._kw_matrix, self._kw_len = _keyword_matrix(kw_lists, dtype)
+
+    @classmethod
+    def from_state(
+        cls,
+        vocabulary,
+        idf: np.ndarray,
+        doc_term,
+        kw_vocab: dict,
+        kw_matrix,
+        kw_len: np.ndarray,
+        ngram_range: tuple = (1, 2),
+        min_df: int = 1,
+        max_df: float = 0.95,
+        keyword_weight: float = 0.30,
+        threshold: float = 0.0,
+        candidate_ratio: float = 0.10,
+        max_features: Optional[int] = None,
+        compact: bool = False,
+        ids: Optional[list] = None,
+        pruned: Optional[HashedTermSet] = None,
+        inverted: Optional[tuple] = None,
+    ) -> "Retriever":
+        """
+        Reconstruit un Retriever déjà « fitté » à partir de son état (vocabulaire dict ou
+        HashedVocabulary, IDF, matrice doc-terme, matrice mots-clés, termes élagués, listes
+        inversées de _inverted_index), sans réapprendre le TF-IDF. Les tableaux peuvent être
+        des memmaps (cf. src.index_store).
+        """
+        self = cls.__new__(cls)
+        self.fingerprint = None
+        self.has_keywords = kw_matrix is not None
+        self.keyword_weight = float(keyword_weight if self.has_keywords else 0.0)
+        self.threshold = float(threshold)
+        self.candidate_ratio = float(candidate_ratio)
+        self._inverted = inverted
+        self.compact = bool(compact)
+        self.vectorizer = _fitted_vectorizer(ngram_range, min_df, max_df, vocabulary, idf, max_features)
+        self.doc_term = doc_term
+        self._pruned = pruned if pruned is not None else HashedTermSet()
+        self._df = None
+        self.ids = list(ids) if ids is not None else list(range(doc_term.shape[0]))
+        self._kw_vocab = kw_vocab
+        self._kw_matrix = kw_matrix
+        self._kw_len = kw_len
+        return self
+
+    def _keyword_queries(self, queries: List[str]):
+        """Indicatrices (requêtes x vocabulaire mots-clés) des tokens de chaque requête."""
+        rows, cols = [], []
+        for r, query in enumerate(queries):
+            for t in set(_tokenize(query)):
+                c = self._kw_vocab.get(t)
+                if c is not None:
+                    rows.append(r)
+                    cols.append(c)
+        return sparse.csr_matrix(
+            (np.ones(len(rows), dtype=self._kw_len.dtype), (rows, cols)),
+            shape=(len(queries), len(self._kw_vocab)),
+        )
 
-    def search(self, query: str, top_k: int = 3) -> List[Tuple[int, float]]:
+    def _query_vectors(self, queries: List[str], trace=None) -> tuple:
+        """(vecteurs TF-IDF, indicatrices mots-clés ou None) des requêtes."""
+        with span(trace, "tfidf"):
+            q_vecs = self.vectorizer.transform(queries)
+        with span(trace, "scoring"):
+            q_kw = self._keyword_queries(queries) if self.keyword_weight > 0.0 else None
+        return q_vecs, q_kw
+
+    def _inverted_index(self) -> tuple:
+        """(listes inversées des termes TF-IDF, listes inversées des mots-clés ou None)."""
+        inverted = self._inverted
+        if inverted is None:
+            kw = _postings(self._kw_matrix) if self.has_keywords else None
+            inverted = self._inverted = (_postings(self.doc_term), kw)
+        return inverted
+
+    def _candidates(self, q_vec, q_kw) -> Optional[np.ndarray]:
+        """
+        Lignes (triées) partageant au moins un terme ou un mot-clé avec la requête ; None si
+        les listes inversées concernées dépassent candidate_ratio x nb de documents.
+        """
+        limit = self.candidate_ratio * self.doc_term.shape[0]
+        terms, kws = self._inverted_index()
+        parts, total = [], 0
+        for postings, cols in ((terms, q_vec.indices), (kws, None if q_kw is None else q_kw.indices)):
+            if cols is None:
+                continue
+            indptr, indices = postings
+            for c in cols:
+                lo, hi = indptr[c], indptr[c + 1]
+                total += hi - lo
+                if total > limit:
+                    return None
+                parts.append(indices[lo:hi])
+        return np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def _candidate_search(self, q_vec, q_kw, top_k: int) -> Optional[List[Tuple[int, float]]]:
+        """
+        top_k d'une requête (1 ligne de _query_vectors) en ne scorant que ses candidats :
+        les autres lignes ont un score nul. None si la requête est trop peu sélective.
+        """
+        if self.candidate_ratio <= 0.0 or top_k <= 0:
+            return None
+        cand = self._candidates(q_vec, q_kw)
+        if cand is None:
+            return None
+        hits = []
+        if cand.size:
+            kw_matrix = kw_len = None
+            if q_kw is not None:
+                kw_matrix, kw_len = self._kw_matrix[cand], self._kw_len[cand]
+            # mêmes opérations que le score complet, restreintes aux lignes candidates
+            scores = _fused_scores(self.doc_term[cand], q_vec, self.keyword_weight, kw_matrix, kw_len, q_kw)[0]
+            hits = [(int(cand[j]), s) for j, s in _select_top_k(scores, top_k, self.threshold) if s > 0.0]
+        if self.threshold <= 0.0:
+            hits = _pad_with_zeros(hits, top_k, self.doc_term.shape[0])
+        return hits
+
+    def search(self, query: str, top_k: int = 3, trace=None) -> List[Tuple[int, float]]:
         if not query:
             return []
+        q_vecs, q_kw = self._query_vectors([query], trace)
+        with span(trace, "scoring"):
+            # Index inversé si la requête est sélective, sinon score hybride de toutes les lignes
+            hits = self._candidate_search(q_vecs, q_kw, top_k)
+            if hits is None:
+                scores = _fused_scores(self.doc_term, q_vecs, self.keyword_weight, self._kw_matrix, self._kw_len, q_kw)
+                hits = _select_top_k(scores[0], top_k, self.threshold)
+        return hits
+
+    def search_batch(self, queries: Iterable[str], top_k: int = 3, trace=None) -> List[List[Tuple[int, float]]]:
+        """
+        Recherche groupée : même résultat que [self.search(q, top_k) for q in queries], avec une
+        transformation TF-IDF par paquet de requêtes ; les requêtes peu sélectives sont scorées
+        ensemble par un produit creux (paquets de taille bornée pour limiter la matrice dense
+        requêtes x docs).
+        """
+        queries = list(queries)
+        results: List[List[Tuple[int, float]]] = [[] for _ in queries]
+        todo = [i for i, q in enumerate(queries) if q]
+        chunk = max(1, _BATCH_CELLS // max(self.doc_term.shape[0], 1))
+        for start in range(0, len(todo), chunk):
+            ids = todo[start:start + chunk]
+            q_vecs, q_kw = self._query_vectors([queries[i] for i in ids], trace)
+            with span(trace, "scoring"):
+                full = self._candidate_rows(q_vecs, q_kw, top_k, ids, results)
+                if full:
+                    scores = _fused_scores(self.doc_term, q_vecs[full], self.keyword_weight, self._kw_matrix,
+                                           self._kw_len, None if q_kw is None else q_kw[full])
+                    for r, row in enumerate(full):
+                        results[ids[row]] = _select_top_k(scores[r], top_k, self.threshold)
+        return results
 
-        # 1) Score cosinus
-        q_vec = self.vectorizer.transform([query])
-        cos_scores = cosine_similarity(q_vec, self.doc_term).ravel()
-
-        # 2) Score mots-clés (si dispo)
-        if self.keyword_weight > 0.0:
-            q_tokens = _tokenize(query)
-            combined: List[Tuple[int, float]] = []
-            for i, cos_s in enumerate(cos_scores):
-                kw_s = _keyword_overlap_score(q_tokens, self._kw_lists[i])
-                final = (1.0 - self.keyword_weight) * float(cos_s) + self.keyword_weight * float(kw_s)
-                if final >= self.threshold:
-                    combined.append((int(i), final))
-            combined.sort(key=lambda x: x[1], reverse=True)
-            return combined[:top_k]
-
-        # Sinon: cosinus pur
-        idxs = cos_scores.argsort()[::-1]
-        out: List[Tuple[int, float]] = []
-        for i in idxs:
-            s = float(cos_scores[i])
-            if s < self.threshold:
-                break
-            out.append((int(i), s))
-            if len(out) == top_k:
-                break
+    def _candidate_rows(self, q_vecs, q_kw, top_k: int, ids: List[int], results: list) -> List[int]:
+        """
+        Résout par l'index inversé les requêtes sélectives d'un paquet (results[ids[row]]) ;
+        renvoie les lignes du paquet à scorer sur tout le corpus.
+        """
+        if self.candidate_ratio <= 0.0:
+            return list(range(len(ids)))
+        full = []
+        for row, i in enumerate(ids):
+            hits = self._candidate_search(q_vecs[row], None if q_kw is None else q_kw[row], top_k)
+            if hits is None:
+                full.append(row)
+            else:
+                results[i] = hits
+        return full
+
+    # ---- Mises à jour incrémentales (par id) ----
+    def copy(self) -> "Retriever":
+        """Copie indépendante (matrices recopiées en mémoire) : la modifier ne touche pas l'original."""
+        other = self.__class__.__new__(self.__class__)
+        other.__dict__.update(self.__dict__)
+        v = self.vectorizer
+        other.vectorizer = _fitted_vectorizer(v.ngram_range, v.min_df, v.max_df, v.vocabulary_.copy(),
+                                              np.array(v.idf_), v.max_features)
+        other.doc_term = sparse.csr_matrix(self.doc_term, copy=True)
+        other._df = None if self._df is None else self._df.copy()
+        other.ids = list(self.ids)
+        if self.has_keywords:
+            other._kw_vocab = dict(self._kw_vocab)
+            other._kw_matrix = sparse.csr_matrix(self._kw_matrix, copy=True)
+            other._kw_len = np.array(self._kw_len)
+        return other
+
+    def add(self, row_id, doc: str, keywords=None) -> float:
+        """Ajoute une ligne en fin d'index ; renvoie la dérive d'IDF (cf. apply_changes)."""
+        if row_id in self.ids:
+            raise KeyError(f"id déjà présent dans l'index : {row_id!r}")
+        return self.apply_changes({row_id: (doc, keywords)})
+
+    def update(self, row_id, doc: str, keywords=None) -> float:
+        """Remplace le texte (et les mots-clés) d'une ligne existante."""
+        if row_id not in self.ids:
+            raise KeyError(f"id absent de l'index : {row_id!r}")
+        return self.apply_changes({row_id: (doc, keywords)})
+
+    def delete(self, row_id) -> float:
+        return self.apply_changes({}, [row_id])
+
+    def apply_changes(self, upserts: dict, deletes: Iterable = ()) -> float:
+        """
+        Ajoute / remplace / supprime des lignes par id, sans réapprendre le TF-IDF.
+        - upserts : {id: (texte indexé, cellule mots_cles)} ; id inconnu => ajout en fin d'index
+        - deletes : ids à retirer (les lignes suivantes remontent d'autant)
+        Les lignes touchées sont vectorisées avec l'IDF courant (les nouveaux termes sont ajoutés
+        au vocabulaire, sauf ceux que l'apprentissage avait élagués : ignorés comme par
+        transform) et substituées dans les matrices CSR. Les fréquences documentaires sont
+        tenues à jour ; renvoie la dérive d'IDF (idf_drift) : au-delà d'un seuil, l'appelant
+        reconstruit l'index complet.
+        Modifie l'objet : si d'autres threads l'utilisent, appliquer sur une copie (copy()).
+        """
+        positions = {rid: i for i, rid in enumerate(self.ids)}
+        deletes = list(dict.fromkeys(deletes))
+        unknown = [rid for rid in deletes if rid not in positions]
+        if unknown:
+            raise KeyError(f"ids absents de l'index : {unknown}")
+        if set(deletes) & set(upserts):
+            raise ValueError("un même id ne peut pas être à la fois modifié et supprimé")
+        replaced = [(positions[rid], v) for rid, v in upserts.items() if rid in positions]
+        added = [(rid, v) for rid, v in upserts.items() if rid not in positions]
+        removed = sorted(positions[rid] for rid in deletes)
+        values = [v for _, v in replaced] + [v for _, v in added]
+
+        # 1) fréquences documentaires : retrait des anciennes versions des lignes touchées
+        vocab = self.vectorizer.vocabulary_
+        df = self._doc_freq()
+        touched = [p for p, _ in replaced] + removed
+        if touched:
+            df -= np.bincount(self.doc_term[touched].indices, minlength=len(df))
+
+        # 2) comptage des nouvelles versions (vocabulaire étendu au besoin), puis ajout aux df
+        analyzer = self.vectorizer.build_analyzer()
+        pruned = self._pruned
+        indptr, indices, counts = [0], [], []
+        for doc, _ in values:
+            row = {}
+            for term in analyzer(doc):
+                j = vocab.get(term)
+                if j is None:
+                    if term in pruned:
+                        continue
+                    j = vocab.setdefault(term, len(vocab))
+                row[j] = row.get(j, 0) + 1
+            indices.extend(row)
+            counts.extend(row.values())
+            indptr.append(len(indices))
+        n_terms = len(vocab)
+        tf = sparse.csr_matrix((np.asarray(counts, dtype=np.float64), np.asarray(indices, dtype=np.int32),
+                                np.asarray(indptr, dtype=np.int64)), shape=(len(values), n_terms))
+        df = np.concatenate([df, np.zeros(n_terms - len(df), dtype=df.dtype)])
+        df += np.bincount(tf.indices, minlength=n_terms)
+
+        # 3) IDF : inchangé pour les termes connus, calculé depuis les df pour les nouveaux
+        n_docs = self.doc_term.shape[0] - len(removed) + len(added)
+        v = self.vectorizer
+        idf = np.concatenate([v.idf_, _smooth_idf(df[len(v.idf_):], n_docs).astype(v.idf_.dtype)])
+        self.vectorizer = _fitted_vectorizer(v.ngram_range, v.min_df, v.max_df, vocab, idf, v.max_features)
+        rows = tf  # tf x idf puis normalisation L2 par ligne (comme TfidfVectorizer.transform)
+        rows.data *= self.vectorizer.idf_[rows.indices]
+        row_of = np.repeat(np.arange(len(values)), np.diff(rows.indptr))
+        norms = np.sqrt(np.bincount(row_of, weights=rows.data ** 2, minlength=len(values)))
+        if rows.nnz:
+            rows.data /= norms[row_of]
+        self.doc_term = _splice_rows(
+            self.doc_term, {p: rows[i] for i, (p, _) in enumerate(replaced)}, removed,
+            rows[len(replaced):], n_terms,
+        )
+        self._df = df
+        self._inverted = None
+
+        # 4) mots-clés : mêmes substitutions dans la matrice d'incidence
+        if self.has_keywords:
+            kw_lists = [_keyword_list(kw) for _, kw in values]
+            kw_indptr, kw_indices = [0], []
+            for kws in kw_lists:
+                kw_indices.extend(self._kw_vocab.setdefault(k, len(self._kw_vocab)) for k in kws)
+                kw_indptr.append(len(kw_indices))
+            kw_rows = sparse.csr_matrix(
+                (np.ones(len(kw_indices), dtype=self._kw_len.dtype), np.asarray(kw_indices, dtype=np.int32),
+                 np.asarray(kw_indptr, dtype=np.int64)),
+                shape=(len(values), len(self._kw_vocab)),
+            )
+            self._kw_matrix = _splice_rows(
+                self._kw_matrix, {p: kw_rows[i] for i, (p, _) in enumerate(replaced)}, removed,
+                kw_rows[len(replaced):], len(self._kw_vocab),
+            )
+            self._kw_len = np.diff(self._kw_matrix.indptr).astype(self._kw_len.dtype)
+
+        removed_set = set(removed)
+        self.ids = [rid for i, rid in enumerate(self.ids) if i not in removed_set] + [rid for rid, _ in added]
+        return self.idf_drift()
+
+    def _doc_freq(self) -> np.ndarray:
+        """Nombre de documents contenant chaque terme du vocabulaire."""
+        if self._df is None:
+            self._df = np.bincount(self.doc_term.indices, minlength=len(self.vectorizer.vocabulary_)).astype(np.int64)
+        return self._df
+
+    def idf_drift(self) -> float:
+        """
+        Écart relatif (L1) entre l'IDF utilisé et celui des fréquences documentaires actuelles,
+        sur les termes encore présents : 0 juste après un apprentissage complet.
+        """
+        df = self._doc_freq()
+        live = df > 0
+        if not live.any():
+            return 0.0
+        used = self.vectorizer.idf_[live]
+        current = _smooth_idf(df[live], self.doc_term.shape[0])
+        return float(np.abs(current - used).sum() / used.sum())
+
+    # ---- Mémoire ----
+    def memory_usage(self) -> dict:
+        """
+        Octets occupés par l'index : vocabulaire, IDF, termes élagués, matrice doc-terme, mots-clés et listes
+        inversées (si construites). Les memmaps comptent pour leur taille (pages partagées).
+        """
+        vocab = self.vectorizer.vocabulary_
+        out = {
+            "vocabulary": vocab.nbytes() if isinstance(vocab, HashedVocabulary) else dict_nbytes(vocab),
+            "idf": int(self.vectorizer.idf_.nbytes),
+            "pruned": int(self._pruned.hashes.nbytes),
+            "doc_term": _csr_nbytes(self.doc_term),
+            "keywords": _csr_nbytes(self._kw_matrix) + int(self._kw_len.nbytes) + dict_nbytes(self._kw_vocab),
+            "inverted": sum(int(a.nbytes) for part in (self._inverted or ()) if part is not None for a in part),
+        }
+        out["total"] = sum(out.values())
         return out
@@ -0,0 +1,344 @@
+# src/server.py — serveur HTTP/JSON asyncio au-dessus de src.engine (sans Streamlit)
+#
+# Lancer : python -m src.server --port 8000 --workers 4
+#   POST /answer        {"query": "...", "session_id": "..."}        -> réponse
+#   POST /answer/batch  {"queries": ["...", ...], "session_id": "..."} -> {"results": [...]}
+#   GET  /health                                                      -> état + empreinte de l'index
+#   GET  /metrics       histogrammes de latence par étape (texte Prometheus) ; /metrics.json en JSON
+#   GET  /export?start=AAAA-MM-JJ&end=AAAA-MM-JJ&gzip=1                -> CSV des interactions (flux par blocs),
+#                       seulement avec --enable-export (journal complet des requêtes, sans authentification)
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import date
+from pathlib import Path
+from typing import Iterator, NamedTuple
+from urllib.parse import parse_qsl
+
+from src import engine
+from src.analytics import get_sink, iter_export_csv
+from src.metrics import REGISTRY
+from src.pipeline import get_pipeline
+from src.sharding import ShardedRetriever
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH = 256
+EXPORT_THREADS = 2  # exports simultanés ; les suivants attendent leur tour
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Stream(NamedTuple):
+    """Réponse envoyée par blocs (Transfer-Encoding: chunked) au lieu d'un corps en mémoire."""
+    chunks: Iterator[bytes]
+    content_type: str
+    filename: str
+
+
+class AnswerServer:
+    """
+    Sert answer() en HTTP/1.1 (keep-alive). Le parsing HTTP tourne dans la boucle asyncio,
+    le calcul (NER, TF-IDF, templates) dans un pool de threads.
+    """
+
+    def __init__(self, base_dir=BASE_DIR, config_path="config.yaml", db_path=None, threads: int = 8,
+                 metrics: bool = True, export: bool = False):
+        self.base_dir = base_dir
+        self.config_path = config_path
+        self.db_path = db_path
+        self.metrics = metrics
+        self.export = export
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="answer")
+        # pool séparé : un client d'export lent occupe un thread pendant tout le téléchargement
+        self.export_executor = (ThreadPoolExecutor(max_workers=EXPORT_THREADS, thread_name_prefix="export")
+                                if export else None)
+        self._exports = set()  # connexions en cours d'export, coupées à l'arrêt
+
+    # ---- Pipeline (bloquant, exécuté dans le pool) ----
+    def _pipeline(self):
+        return get_pipeline(self.base_dir, self.config_path)
+
+    def _sink(self):
+        return get_sink(self.db_path) if self.db_path else None
+
+    def _answer(self, payload: dict) -> dict:
+        query = payload.get("query")
+        if not isinstance(query, str) or not query.strip():
+            raise HttpError(400, "champ 'query' (texte non vide) requis")
+        return engine.answer(self._pipeline(), query.strip(), sink=self._sink(), session_id=payload.get("session_id"))
+
+    def _answer_batch(self, payload: dict) -> dict:
+        queries = payload.get("queries")
+        if not isinstance(queries, list) or not all(isinstance(q, str) and q.strip() for q in queries):
+            raise HttpError(400, "champ 'queries' (liste de textes non vides) requis")
+        if len(queries) > MAX_BATCH:
+            raise HttpError(413, f"au plus {MAX_BATCH} requêtes par lot")
+        results = engine.answer_batch(self._pipeline(), [q.strip() for q in queries],
+                                      sink=self._sink(), session_id=payload.get("session_id"))
+        return {"results": results}
+
+    def _health(self, _payload) -> dict:
+        pipe = self._pipeline()
+        return {"status": "ok", "pid": os.getpid(), "pipeline_version": pipe.version,
+                "index_fingerprint": pipe.retr.fingerprint}
+
+    # Métriques du processus qui répond (un registre par worker)
+    def _metrics(self, _payload) -> str:
+        if not self.metrics:
+            raise HttpError(404, "métriques désactivées")
+        return REGISTRY.prometheus()
+
+    def _metrics_json(self, _payload) -> dict:
+        if not self.metrics:
+            raise HttpError(404, "métriques désactivées")
+        return {"pid": os.getpid(), **REGISTRY.snapshot()}
+
+    def _export(self, params: dict) -> Stream:
+        """Export CSV (gzip si gzip=1) des interactions entre deux jours inclus (bornes optionnelles)."""
+        if not self.export:
+            raise HttpError(404, "export désactivé (--enable-export)")
+        if not self.db_path:
+            raise HttpError(404, "analytics désactivées (--db '')")
+        try:
+            start, end = (date.fromisoformat(params[k]) if params.get(k) else None for k in ("start", "end"))
+        except ValueError:
+            raise HttpError(400, "dates attendues au format AAAA-MM-JJ")
+        compress = params.get("gzip", "0").lower() in ("1", "true", "oui")
+        name = f"interactions_{start or 'debut'}_{end or 'fin'}.csv" + (".gz" if compress else "")
+        content_type = "application/gzip" if compress else "text/csv; charset=utf-8"
+        # générateur paresseux : la base n'est lue qu'à l'envoi, bloc par bloc
+        return Stream(iter_export_csv(self.db_path, start, end, compress), content_type, name)
+
+    _ROUTES = {
+        ("POST", "/answer"): _answer,
+        ("POST", "/answer/batch"): _answer_batch,
+        ("GET", "/health"): _health,
+        ("GET", "/metrics"): _metrics,
+        ("GET", "/metrics.json"): _metrics_json,
+        ("GET", "/export"): _export,
+    }
+
+    # ---- HTTP ----
+    async def _read_request(self, reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "ligne de requête invalide")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            raise HttpError(400, "Content-Length invalide")
+        if length < 0:
+            raise HttpError(400, "Content-Length invalide")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "corps de requête trop volumineux")
+        body = await reader.readexactly(length) if length else b""
+        keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+        path, _, query = target.partition("?")
+        return method, path, query, body, keep_alive
+
+    async def _dispatch(self, method: str, path: str, body: bytes, query: str = ""):
+        handler = self._ROUTES.get((method, path))
+        if handler is None:
+            if any(p == path for _, p in self._ROUTES):
+                raise HttpError(405, "méthode non autorisée")
+            raise HttpError(404, "ressource inconnue")
+        payload = dict(parse_qsl(query))  # paramètres d'URL (GET) ; sinon corps JSON
+        if body:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise HttpError(400, "JSON invalide")
+            if not isinstance(payload, dict):
+                raise HttpError(400, "objet JSON attendu")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, handler, self, payload)
+
+    @staticmethod
+    def _response(status: int, data, keep_alive: bool) -> bytes:
+        if isinstance(data, str):  # texte brut (format d'exposition Prometheus)
+            body, content_type = data.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, content_type = json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        return head.encode("latin-1") + body
+
+    async def _send_stream(self, writer, stream: Stream, keep_alive: bool):
+        """
+        Envoie `stream` en blocs HTTP/1.1 (chunked) : mémoire bornée par un bloc quel que soit
+        l'export. Le générateur est parcouru dans un seul thread du pool d'export (connexion
+        SQLite), pas dans celui de /answer ; chaque bloc attend que le client ait consommé le
+        précédent (drain).
+        """
+        writer.write((
+            f"HTTP/1.1 200 OK\r\n"
+            f"Content-Type: {stream.content_type}\r\n"
+            f'Content-Disposition: attachment; filename="{stream.filename}"\r\n'
+            f"Transfer-Encoding: chunked\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode("latin-1"))
+        loop = asyncio.get_running_loop()
+
+        async def send(chunk: bytes):
+            writer.write(f"{len(chunk):x}\r\n".encode("latin-1") + chunk + b"\r\n")
+            await writer.drain()
+
+        def pump():
+            with closing(stream.chunks):
+                for chunk in stream.chunks:
+                    asyncio.run_coroutine_threadsafe(send(chunk), loop).result()
+
+        self._exports.add(writer)
+        try:
+            await loop.run_in_executor(self.export_executor, pump)
+        finally:
+            self._exports.discard(writer)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    method, path, query, body, keep_alive = await self._read_request(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HttpError as e:  # requête illisible : réponse d'erreur puis fermeture
+                    writer.write(self._response(e.status, {"error": str(e)}, False))
+                    await writer.drain()
+                    break
+                try:
+                    status, data = 200, await self._dispatch(method, path, body, query)
+                except HttpError as e:
+                    status, data = e.status, {"error": str(e)}
+                except Exception as e:  # erreur du pipeline : on répond 500 sans couper le serveur
+                    status, data = 500, {"error": f"{type(e).__name__}: {e}"}
+                if isinstance(data, Stream):
+                    try:
+                        await self._send_stream(writer, data, keep_alive)
+                    except Exception:  # en-têtes déjà envoyés : la réponse tronquée est signalée par la fermeture
+                        break
+                else:
+                    writer.write(self._response(status, data, keep_alive))
+                    await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.LimitOverrunError, ValueError):
+            writer.write(self._response(400, {"error": "requête HTTP invalide"}, False))
+        finally:
+            writer.close()
+
+    async def serve(self, sock: socket.socket):
+        server = await asyncio.start_server(self.handle, sock=sock)
+        loop = asyncio.get_running_loop()
+        stop = loop.create_future()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set_result, None)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows : arrêt par KeyboardInterrupt
+        async with server:
+            await stop
+        self.executor.shutdown(wait=True)
+        if self.export_executor is not None:
+            # un client lent garderait son thread jusqu'à la fin du téléchargement : connexion
+            # coupée, l'envoi suivant échoue ; attente hors de la boucle, dont pump() a besoin
+            for writer in list(self._exports):
+                writer.transport.abort()
+            await loop.run_in_executor(None, self.export_executor.shutdown)
+        retr = self._pipeline().retr
+        if isinstance(retr, ShardedRetriever):
+            retr.close()  # pool de recherche répartie : sinon la sortie du worker attend ses processus
+        if self.db_path:
+            get_sink(self.db_path).close()
+
+
+def _worker(sock, base_dir, config_path, db_path, threads, metrics, export):
+    server = AnswerServer(base_dir, config_path, db_path, threads, metrics, export)
+    try:
+        asyncio.run(server.serve(sock))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serveur HTTP/JSON du chatbot FAQ UV-BF")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=1, help="processus (partagent l'index memmap)")
+    ap.add_argument("--threads", type=int, default=8, help="threads de calcul par processus")
+    ap.add_argument("--config", default="config.yaml")
+    ap.add_argument("--db", default=str(BASE_DIR / "chatbot_analytics.db"),
+                    help="base analytics ('' pour ne pas journaliser)")
+    ap.add_argument("--no-metrics", action="store_true", help="désactive /metrics et /metrics.json")
+    ap.add_argument("--enable-export", action="store_true",
+                    help="active GET /export (journal des interactions, sans authentification : réseau de confiance uniquement)")
+    args = ap.parse_args()
+
+    # Construit/persiste l'index une seule fois avant de lancer les workers : ils ne font
+    # ensuite que le mapper en mémoire (pages partagées via le cache du système).
+    # Pas de thread de surveillance avant le fork : chaque worker démarre le sien.
+    pipe = get_pipeline(BASE_DIR, args.config, watch=False)
+
+    sock = socket.create_server((args.host, args.port), reuse_port=False)
+    sock.set_inheritable(True)
+    print(f"Écoute sur http://{args.host}:{args.port} ({args.workers} processus x {args.threads} threads)")
+
+    if args.workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        _worker(sock, BASE_DIR, args.config, args.db or None, args.threads, not args.no_metrics,
+                args.enable_export)
+        return
+
+    # Recherche répartie (retriever.shards) : aucun pool ne doit être hérité du parent ; les
+    # blocs en mémoire partagée sont créés ici, une seule fois pour tous les workers
+    if isinstance(pipe.retr, ShardedRetriever):
+        pipe.retr.prepare_fork()
+
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_worker,
+                         args=(sock, BASE_DIR, args.config, args.db or None, args.threads, not args.no_metrics,
+                               args.enable_export))
+             for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+            p.join()
+    finally:
+        if isinstance(pipe.retr, ShardedRetriever):
+            pipe.retr.close()  # blocs en mémoire partagée des workers, créés ici
+
+
+if __name__ == "__main__":
+    main()
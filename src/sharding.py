@@ -0,0 +1,243 @@
+# src/sharding.py — recherche répartie sur un pool de processus (blocs de lignes en mémoire partagée)
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from src.metrics import span
+from src.retriever import _BATCH_CELLS, Retriever, _fused_scores, _select_top_k
+
+
+# ------------ Blocs en mémoire partagée ------------
+def _shard_bounds(indptr: np.ndarray, n_shards: int) -> List[Tuple[int, int]]:
+    """Découpe les lignes en `n_shards` blocs contigus d'environ le même nombre de non-zéros."""
+    n_rows = len(indptr) - 1
+    targets = np.linspace(0, indptr[-1], n_shards + 1)[1:-1]
+    cuts = np.searchsorted(indptr, targets).clip(0, n_rows)
+    bounds = np.unique(np.concatenate([[0], cuts, [n_rows]]))
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _csr_arrays(prefix: str, mat) -> dict:
+    """Tableaux d'une CSR (indices et indptr dans un même type entier, pour éviter toute copie)."""
+    index_dtype = np.int32 if mat.nnz < 2 ** 31 else np.int64
+    return {
+        f"{prefix}_data": np.ascontiguousarray(mat.data),
+        f"{prefix}_indices": np.ascontiguousarray(mat.indices, dtype=index_dtype),
+        f"{prefix}_indptr": np.ascontiguousarray(mat.indptr, dtype=index_dtype),
+    }
+
+
+def _to_shared(arrays: dict) -> Tuple[shared_memory.SharedMemory, dict]:
+    """Copie les tableaux dans un seul bloc de mémoire partagée ; renvoie (bloc, {nom: (offset, dtype, shape)})."""
+    layout, offset = {}, 0
+    for name, arr in arrays.items():
+        offset = -(-offset // 8) * 8  # alignement sur 8 octets
+        layout[name] = (offset, arr.dtype.str, arr.shape)
+        offset += arr.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, arr in arrays.items():
+        off, dtype, shape = layout[name]
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off)[...] = arr
+    return shm, layout
+
+
+# ------------ Côté processus du pool ------------
+_attached = {}  # nom du bloc -> (SharedMemory, doc_term, kw_matrix, kw_len), par processus
+
+
+def _attach(spec: dict) -> tuple:
+    entry = _attached.get(spec["name"])
+    if entry is None:
+        shm = shared_memory.SharedMemory(name=spec["name"])
+        arr = {name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off)
+               for name, (off, dtype, shape) in spec["layout"].items()}
+        doc = sparse.csr_matrix((arr["doc_data"], arr["doc_indices"], arr["doc_indptr"]),
+                                shape=spec["doc_shape"], copy=False)
+        kw = kw_len = None
+        if spec["kw_shape"] is not None:
+            kw = sparse.csr_matrix((arr["kw_data"], arr["kw_indices"], arr["kw_indptr"]),
+                                   shape=spec["kw_shape"], copy=False)
+            kw_len = arr["kw_len"]
+        entry = _attached[spec["name"]] = (shm, doc, kw, kw_len)
+    return entry
+
+
+def _score_shard(spec: dict, q_vecs, q_kw, keyword_weight: float, threshold: float, top_k: int) -> list:
+    """top_k (indice global, score) de chaque requête sur un bloc de lignes."""
+    _, doc, kw, kw_len = _attach(spec)
+    start = spec["start"]
+    out = []
+    chunk = max(1, _BATCH_CELLS // max(doc.shape[0], 1))
+    for lo in range(0, q_vecs.shape[0], chunk):
+        scores = _fused_scores(doc, q_vecs[lo:lo + chunk], keyword_weight, kw, kw_len,
+                               None if q_kw is None else q_kw[lo:lo + chunk])
+        out.extend([(start + i, s) for i, s in _select_top_k(row, top_k, threshold)] for row in scores)
+    return out
+
+
+def _release(owner: int, executor=None, blocks=()):
+    """Arrête le pool / libère les blocs, seulement dans le processus qui les a créés (pas un enfant forké)."""
+    if os.getpid() != owner:
+        return
+    if executor is not None:
+        # wait=True : dans un processus forké (worker du serveur), sa sortie rejoint les
+        # processus du pool ; un arrêt non attendu s'y bloque (Python 3.11)
+        executor.shutdown(wait=True, cancel_futures=True)
+    for shm in blocks:
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# ------------ Retriever réparti ------------
+class ShardedRetriever:
+    """
+    Recherche d'un Retriever répartie sur plusieurs processus, avec les mêmes résultats.
+    - La matrice doc-terme (et la matrice mots-clés) est découpée en `n_shards` blocs de lignes
+      (équilibrés en non-zéros), copiés une fois en mémoire partagée ; les processus du pool
+      les mappent sans copie.
+    - Les requêtes sont vectorisées une seule fois ici ; les requêtes sélectives sont résolues
+      ici par l'index inversé du Retriever, les autres sont scorées en parallèle sur chaque
+      bloc, qui renvoie ses top_k, fusionnés ensuite (score décroissant, indice croissant : même
+      ordre que Retriever.search, ex-aequo compris).
+    Le pool et la mémoire partagée sont créés à la première recherche non sélective et libérés
+    par close() ou à la destruction. Avant un fork, prepare_fork() arrête le pool en gardant les
+    blocs : chaque processus enfant démarre son propre pool sur ces mêmes blocs, qui restent
+    à la charge du parent (un seul exemplaire en mémoire partagée quel que soit le nombre d'enfants).
+    Les autres attributs (fingerprint, ids, vectorizer...) sont ceux du Retriever enveloppé.
+    """
+
+    def __init__(self, base: Retriever, n_shards: Optional[int] = None, mp_context: Optional[str] = None):
+        self.base = base
+        self.n_shards = max(1, n_shards or os.cpu_count() or 1)
+        if mp_context is None:
+            mp_context = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.mp_context = mp_context
+        self._lock = threading.Lock()
+        self._pid = None           # processus propriétaire du pool
+        self._executor = None
+        self._pool_finalizer = None
+        self._owner = None         # processus propriétaire des blocs en mémoire partagée
+        self._specs = []
+        self._blocks_finalizer = None
+
+    def __getattr__(self, name):
+        return getattr(self.base, name)
+
+    # ---- Cycle de vie ----
+    def _share(self):
+        """Copie les blocs de lignes en mémoire partagée (une fois, dans ce processus)."""
+        base = self.base
+        bounds = _shard_bounds(base.doc_term.indptr, self.n_shards)
+        blocks, specs = [], []
+        try:
+            for start, stop in bounds:
+                doc = base.doc_term[start:stop]
+                arrays = _csr_arrays("doc", doc)
+                kw_shape = None
+                if base.has_keywords:
+                    kw = base._kw_matrix[start:stop]
+                    arrays.update(_csr_arrays("kw", kw))
+                    arrays["kw_len"] = np.ascontiguousarray(base._kw_len[start:stop])
+                    kw_shape = kw.shape
+                shm, layout = _to_shared(arrays)
+                blocks.append(shm)
+                specs.append({"name": shm.name, "layout": layout, "start": start,
+                              "doc_shape": doc.shape, "kw_shape": kw_shape})
+        except Exception:
+            _release(os.getpid(), None, blocks)
+            raise
+        self._specs, self._owner = specs, os.getpid()
+        self._blocks_finalizer = weakref.finalize(self, _release, self._owner, None, blocks)
+
+    def _ensure_started(self):
+        with self._lock:
+            if not self._specs:
+                self._share()
+            if self._pid != os.getpid():  # premier appel, ou processus enfant après fork
+                executor = ProcessPoolExecutor(max_workers=len(self._specs),
+                                               mp_context=multiprocessing.get_context(self.mp_context))
+                self._executor, self._pid = executor, os.getpid()
+                self._pool_finalizer = weakref.finalize(self, _release, self._pid, executor)
+
+    def _stop_pool(self):
+        if self._pool_finalizer is not None:
+            self._pool_finalizer()  # sans effet si le pool appartient à un autre processus
+        self._pid = self._executor = self._pool_finalizer = None
+
+    def prepare_fork(self):
+        """
+        À appeler avant de forker des processus de service : arrête le pool de ce processus
+        (les enfants créent le leur au besoin) et crée les blocs en mémoire partagée s'ils
+        n'existent pas encore, pour que les enfants les réutilisent au lieu d'en recopier.
+        """
+        with self._lock:
+            if self._executor is not None and self.mp_context == "forkserver":
+                self.mp_context = "spawn"  # le forkserver de ce processus n'est pas utilisable par ses enfants forkés
+            self._stop_pool()
+            if not self._specs:
+                self._share()
+
+    def close(self):
+        with self._lock:
+            self._stop_pool()
+            if self._owner == os.getpid():
+                self._blocks_finalizer()
+                self._owner = self._blocks_finalizer = None
+                self._specs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # ---- Recherche ----
+    def search(self, query: str, top_k: int = 3, trace=None) -> List[Tuple[int, float]]:
+        if not query:
+            return []
+        return self.search_batch([query], top_k, trace)[0]
+
+    def search_batch(self, queries: Iterable[str], top_k: int = 3, trace=None) -> List[List[Tuple[int, float]]]:
+        """Même résultat que Retriever.search_batch ; un appel par bloc pour tout le lot."""
+        queries = list(queries)
+        results: List[List[Tuple[int, float]]] = [[] for _ in queries]
+        todo = [i for i, q in enumerate(queries) if q]
+        if not todo or top_k <= 0:
+            return results
+        base = self.base
+        q_vecs, q_kw = base._query_vectors([queries[i] for i in todo], trace)
+        with span(trace, "scoring"):
+            # requêtes sélectives : index inversé, dans ce processus ; les autres sur les blocs
+            full = base._candidate_rows(q_vecs, q_kw, top_k, todo, results)
+            if not full:
+                return results
+            q_vecs = q_vecs[full]
+            q_kw = None if q_kw is None else q_kw[full]
+            self._ensure_started()
+            try:
+                futures = [self._executor.submit(_score_shard, spec, q_vecs, q_kw,
+                                                 base.keyword_weight, base.threshold, top_k)
+                           for spec in self._specs]
+                per_shard = [f.result() for f in futures]
+            except (BrokenProcessPool, RuntimeError):
+                # pool arrêté (fin de l'interpréteur) ou processus tué : calcul local, et
+                # nouveau pool à la prochaine recherche
+                self.close()
+                return base.search_batch(queries, top_k)
+            for pos, row in enumerate(full):
+                merged = [hit for shard in per_shard for hit in shard[pos]]
+                merged.sort(key=lambda h: (-h[1], h[0]))
+                results[todo[row]] = merged[:top_k]
+        return results
@@ -0,0 +1,80 @@
+# src/snapshot.py — cache disque des fichiers de données déjà analysés (démarrage à chaud)
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+# À incrémenter si le format des fichiers de snapshot change
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+class SnapshotCache:
+    """
+    Résultat de l'analyse d'un fichier (FAQ, JSON) enregistré en pickle dans
+    `directory/<nom du fichier>.<clé>.pkl`, clé = sha256(version du format + version du
+    parseur + contenu du fichier). Au démarrage suivant, si le contenu n'a pas changé, le
+    snapshot est rechargé sans rien réanalyser ; sinon le fichier est analysé et le snapshot
+    réécrit (écriture atomique, anciens snapshots du même fichier supprimés).
+    `directory=None` : pas de cache, seulement la mesure des temps.
+    `report` : {chemin: {"source": "snapshot" | "parsed", "seconds", "bytes"}} des fichiers chargés.
+    Le répertoire ne doit contenir que des snapshots écrits par l'application (pickle).
+    """
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory) if directory else None
+        self.report = {}
+
+    def _key(self, raw: bytes, version: str) -> str:
+        h = hashlib.sha256(f"snapshot-v{SNAPSHOT_FORMAT_VERSION}/{version}/".encode())
+        h.update(raw)
+        return h.hexdigest()[:32]
+
+    def _read(self, target: Path, key: str) -> Optional[tuple]:
+        try:
+            with open(target, "rb") as f:
+                payload = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+            return None  # snapshot illisible : réanalysé puis réécrit
+        if not isinstance(payload, dict) or payload.get("format") != SNAPSHOT_FORMAT_VERSION or payload.get("key") != key:
+            return None
+        return (payload["data"],)
+
+    def _write(self, path: Path, target: Path, key: str, data):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump({"format": SNAPSHOT_FORMAT_VERSION, "key": key, "source": str(path), "data": data},
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, target)
+        except OSError:
+            Path(tmp).unlink(missing_ok=True)  # cache en lecture seule : on continue sans snapshot
+            return
+        for old in self.directory.glob(f"{path.name}.*.pkl"):
+            if old != target:
+                old.unlink(missing_ok=True)
+
+    def load(self, path, parse: Callable[[bytes], object], version: str):
+        """parse(contenu brut du fichier), ou son résultat mis en cache pour ce contenu."""
+        t0 = time.perf_counter()
+        path = Path(path)
+        raw = path.read_bytes()
+        source = "parsed"
+        hit = None
+        if self.directory is not None:
+            key = self._key(raw, version)
+            target = self.directory / f"{path.name}.{key}.pkl"
+            hit = self._read(target, key)
+        if hit is not None:
+            data, source = hit[0], "snapshot"
+        else:
+            data = parse(raw)
+            if self.directory is not None:
+                self._write(path, target, key, data)
+        self.report[str(path)] = {"source": source, "seconds": round(time.perf_counter() - t0, 6), "bytes": len(raw)}
+        return data
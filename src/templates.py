@@ -1,33 +1,96 @@
-class TemplateManager:
-    def __init__(self, templates):
-        self.templates = {item["intent"]: item for item in templates.get("intents", [])}
+from string import Formatter
 
-    def render(self, intent, entities):
-        t = self.templates.get(intent)
-        if not t:
-            return {"text": "", "need_more_info": False, "missing": []}
-        required = t.get("required_entities", [])
-        missing = [e for e in required if e not in entities]
-        if missing:
-            prompt = t.get("fallback_prompt") or ("Précisez: " + ", ".join(missing))
-            return {"text": prompt, "need_more_info": True, "missing": missing}
+# Entités recopiées dans les valeurs du template (première valeur extraite)
+ENTITY_KEYS = ("NIVEAU", "SEMESTRE", "MONTANT", "MODE_PAIEMENT", "CONTACT", "SERVICE", "TYPE_EXAMEN")
+_ENTITY_KEYS = frozenset(ENTITY_KEYS)
 
-        values = {}
-        values.update(t.get("defaults", {}))  # ✅ prérempli
-        for k in ["NIVEAU","SEMESTRE","MONTANT","MODE_PAIEMENT","CONTACT","SERVICE","TYPE_EXAMEN"]:
-            if k in entities and entities[k]:
-                values[k] = entities[k][0]
 
+def _compile_format(text: str):
+    """
+    Découpe un texte str.format en [(littéral, champ|None), ...].
+    Renvoie None si un champ n'est pas un simple nom (index, attribut, format, conversion) :
+    on retombe alors sur str.format.
+    """
+    parts = []
+    for literal, field, spec, conversion in Formatter().parse(text):
+        if field is not None and (not field.isidentifier() or spec or conversion):
+            return None
+        parts.append((literal, field))
+    return parts
+
+
+class _RenderPlan:
+    """Template pré-compilé : entités requises, champs référencés et valeurs fixes."""
+
+    __slots__ = ("required", "required_set", "fallback_prompt", "text", "parts",
+                 "suffix", "suffix_parts", "fields", "static")
+
+    def __init__(self, t: dict):
+        self.required = list(t.get("required_entities", []))
+        self.required_set = frozenset(self.required)
+        self.fallback_prompt = t.get("fallback_prompt")
+        self.text = t.get("template_text", "")
+        self.parts = _compile_format(self.text)
+        self.suffix = t.get("contact_suffix", "")
+        self.suffix_parts = _compile_format(self.suffix) if self.suffix else []
+
+        # valeurs indépendantes de la requête : defaults, puis LIEN (prioritaire)
+        self.static = dict(t.get("defaults", {}))
         liens = t.get("default_links", [])
-        values["LIEN"] = liens[0] if liens else ""
+        self.static["LIEN"] = liens[0] if liens else ""
 
-        text = t.get("template_text", "")
-        out = text.format(**{k: values.get(k, "") for k in values})
+        # champs à remplir : ceux des templates + ceux de la condition du suffixe
+        fields = set()
+        for parts in (self.parts, self.suffix_parts):
+            if parts is None:
+                fields = None
+                break
+            fields.update(f for _, f in parts if f is not None)
+        if fields is not None and self.suffix:
+            fields.update(("SERVICE", "CONTACT"))
+        # None = tous les champs possibles (repli str.format)
+        self.fields = None if fields is None else tuple(f for f in fields if f in _ENTITY_KEYS)
 
+    def values(self, entities) -> dict:
+        values = dict(self.static)
+        for k in ENTITY_KEYS if self.fields is None else self.fields:
+            if k in entities and entities[k]:
+                values[k] = entities[k][0]
+        values["LIEN"] = self.static["LIEN"]
+        return values
+
+    @staticmethod
+    def _format(text: str, parts, values: dict) -> str:
+        if parts is None:
+            return text.format(**values)
+        out = []
+        for literal, field in parts:
+            out.append(literal)
+            if field is not None:
+                out.append(format(values[field], ""))  # KeyError comme str.format
+        return "".join(out)
+
+    def render_text(self, values: dict) -> str:
+        out = self._format(self.text, self.parts, values)
         # ✅ suffixe conditionnel
-        suffix = t.get("contact_suffix", "")
-        if suffix and (values.get("SERVICE") or values.get("CONTACT")):
-            out += suffix.format(**{k: values.get(k, "") for k in values})
+        if self.suffix and (values.get("SERVICE") or values.get("CONTACT")):
+            out += self._format(self.suffix, self.suffix_parts, values)
+        return out
+
+
+class TemplateManager:
+    def __init__(self, templates):
+        self.templates = {item["intent"]: item for item in templates.get("intents", [])}
+        self._plans = {intent: _RenderPlan(t) for intent, t in self.templates.items()}
 
-        return {"text": out, "need_more_info": False, "missing": []}
+    def render(self, intent, entities):
+        plan = self._plans.get(intent)
+        if plan is None:
+            return {"text": "", "need_more_info": False, "missing": []}
+        if not plan.required_set.issubset(entities.keys()):
+            missing = [e for e in plan.required if e not in entities]
+            prompt = plan.fallback_prompt or ("Précisez: " + ", ".join(missing))
+            return {"text": prompt, "need_more_info": True, "missing": missing}
 
+        values = plan.values(entities)  # ✅ prérempli (defaults) + entités + LIEN
+        return {"text": plan.render_text(values), "need_more_info": False, "missing": []}
@@ -0,0 +1,75 @@
+# src/tfidf.py — vectorisation TF-IDF des requêtes sans scikit-learn (index déjà appris)
+import re
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+TOKEN_PATTERN = r"(?u)\b\w+\b"
+
+
+class QueryVectorizer:
+    """
+    Équivalent de TfidfVectorizer.transform (analyseur « word », norme L2, smooth_idf) pour
+    un vocabulaire et un IDF déjà appris, avec NumPy / SciPy seulement : un processus qui ne
+    fait que répondre aux requêtes à partir d'un index persisté n'importe pas scikit-learn.
+    Mêmes vecteurs, au bit près, que le TfidfVectorizer dont proviennent vocabulary_ et idf_.
+    Garde les paramètres d'apprentissage (ngram_range, min_df, max_df, max_features) pour
+    pouvoir réapprendre un index équivalent (cf. src.retriever._make_vectorizer).
+    """
+
+    def __init__(self, vocabulary, idf: np.ndarray, preprocessor: Callable[[str], str],
+                 ngram_range: tuple = (1, 2), min_df=1, max_df=1.0, max_features: Optional[int] = None):
+        self.vocabulary_ = vocabulary  # dict ou src.vocabulary.HashedVocabulary
+        self.idf_ = idf
+        self.preprocessor = preprocessor
+        self.ngram_range = tuple(ngram_range)
+        self.min_df = min_df
+        self.max_df = max_df
+        self.max_features = max_features
+        self._token_re = re.compile(TOKEN_PATTERN)
+
+    def build_analyzer(self) -> Callable[[str], List[str]]:
+        """Texte -> termes (n-grammes de mots), dans l'ordre de TfidfVectorizer."""
+        preprocess, findall = self.preprocessor, self._token_re.findall
+        min_n, max_n = self.ngram_range
+
+        def analyze(doc) -> List[str]:
+            if isinstance(doc, bytes):
+                doc = doc.decode("utf-8")
+            words = findall(preprocess(doc))
+            terms = list(words) if min_n == 1 else []
+            for n in range(max(min_n, 2), min(max_n, len(words)) + 1):
+                terms.extend(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+            return terms
+
+        return analyze
+
+    def transform(self, docs: Iterable[str]):
+        """Matrice CSR (docs x vocabulaire) des TF-IDF normalisés L2, dans le type de l'IDF."""
+        analyze, vocab = self.build_analyzer(), self.vocabulary_
+        indptr, indices, counts = [0], [], []
+        for doc in docs:
+            row = {}
+            for term in analyze(doc):
+                j = vocab.get(term)
+                if j is not None:
+                    row[j] = row.get(j, 0) + 1
+            indices.extend(row)
+            counts.extend(row.values())
+            indptr.append(len(indices))
+        n_rows = len(indptr) - 1
+        mat = sparse.csr_matrix(
+            (np.asarray(counts, dtype=self.idf_.dtype), np.asarray(indices, dtype=np.int32),
+             np.asarray(indptr, dtype=np.int32)),
+            shape=(n_rows, len(self.idf_)),
+        )
+        mat.sort_indices()
+        mat.data *= self.idf_[mat.indices]
+        # norme L2 par ligne : carrés dans le type des données, somme séquentielle en float64
+        # (comme sklearn.preprocessing.normalize, d'où des vecteurs identiques)
+        row_of = np.repeat(np.arange(n_rows), np.diff(mat.indptr))
+        norms = np.sqrt(np.bincount(row_of, weights=(mat.data * mat.data).astype(np.float64), minlength=n_rows))
+        if mat.nnz:
+            mat.data = (mat.data / norms[row_of]).astype(mat.data.dtype, copy=False)
+        return mat
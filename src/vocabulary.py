@@ -0,0 +1,112 @@
+# src/vocabulary.py — vocabulaire compact (empreintes 64 bits triées) pour l'index TF-IDF
+import hashlib
+import sys
+from typing import Optional
+
+import numpy as np
+
+
+def term_hash(term: str) -> int:
+    """Empreinte 64 bits (blake2b) d'un terme, stable d'un processus à l'autre."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HashedVocabulary:
+    """
+    Vocabulaire terme -> colonne sans stocker les chaînes : empreintes 64 bits triées
+    + colonne de chaque empreinte (12 octets par terme, contre ~100 pour un dict Python),
+    recherche par dichotomie (np.searchsorted). Les tableaux peuvent être des memmaps.
+    Une collision entre deux termes du vocabulaire est refusée à la construction ; un terme
+    inconnu n'est confondu avec un terme connu qu'avec une probabilité ~ n / 2**64.
+    Remplace le vocabulaire dict du vectoriseur de requêtes (src.tfidf ; seuls get/[]/in/len servent) ;
+    les termes ajoutés ensuite (Retriever.apply_changes, setdefault) vont dans un dict.
+    """
+
+    def __init__(self, hashes: np.ndarray, columns: np.ndarray, extra: Optional[dict] = None):
+        self.hashes = hashes
+        self.columns = columns
+        self.extra = dict(extra or {})
+
+    @classmethod
+    def from_dict(cls, vocabulary: dict) -> "HashedVocabulary":
+        terms = list(vocabulary)
+        hashes = np.fromiter((term_hash(t) for t in terms), dtype=np.uint64, count=len(terms))
+        columns = np.fromiter((vocabulary[t] for t in terms), dtype=np.int32, count=len(terms))
+        order = np.argsort(hashes, kind="stable")
+        hashes, columns = hashes[order], columns[order]
+        if hashes.size > 1 and (hashes[1:] == hashes[:-1]).any():
+            raise ValueError("collision d'empreintes dans le vocabulaire : utiliser un vocabulaire dict")
+        return cls(hashes, columns)
+
+    def _find(self, term: str) -> int:
+        h = np.uint64(term_hash(term))
+        pos = int(np.searchsorted(self.hashes, h))
+        if pos < self.hashes.size and self.hashes[pos] == h:
+            return int(self.columns[pos])
+        return self.extra.get(term, -1)
+
+    def __getitem__(self, term: str) -> int:
+        col = self._find(term)
+        if col < 0:
+            raise KeyError(term)
+        return col
+
+    def get(self, term: str, default=None):
+        col = self._find(term)
+        return default if col < 0 else col
+
+    def __contains__(self, term) -> bool:
+        return isinstance(term, str) and self._find(term) >= 0
+
+    def __len__(self) -> int:
+        return int(self.hashes.size) + len(self.extra)
+
+    def setdefault(self, term: str, column: int) -> int:
+        col = self._find(term)
+        if col < 0:
+            col = self.extra[term] = column
+        return col
+
+    def copy(self) -> "HashedVocabulary":
+        return HashedVocabulary(self.hashes, self.columns, self.extra)
+
+    def nbytes(self) -> int:
+        return self.hashes.nbytes + self.columns.nbytes + dict_nbytes(self.extra)
+
+    def arrays(self) -> tuple:
+        """(empreintes, colonnes) de tout le vocabulaire, termes ajoutés compris (persistance)."""
+        if not self.extra:
+            return self.hashes, self.columns
+        hashes = np.concatenate([self.hashes, np.fromiter((term_hash(t) for t in self.extra), dtype=np.uint64)])
+        columns = np.concatenate([self.columns, np.fromiter(self.extra.values(), dtype=np.int32)])
+        order = np.argsort(hashes, kind="stable")
+        return hashes[order], columns[order]
+
+
+class HashedTermSet:
+    """
+    Ensemble de termes réduit à leurs empreintes 64 bits triées (ex: termes écartés par
+    l'élagage du vocabulaire) ; le tableau peut être un memmap.
+    """
+
+    def __init__(self, hashes: Optional[np.ndarray] = None):
+        self.hashes = np.zeros(0, dtype=np.uint64) if hashes is None else hashes
+
+    @classmethod
+    def from_terms(cls, terms) -> "HashedTermSet":
+        return cls(np.unique(np.fromiter((term_hash(t) for t in terms), dtype=np.uint64)))
+
+    def __contains__(self, term) -> bool:
+        if not isinstance(term, str) or not self.hashes.size:
+            return False
+        h = np.uint64(term_hash(term))
+        pos = int(np.searchsorted(self.hashes, h))
+        return pos < self.hashes.size and self.hashes[pos] == h
+
+    def __len__(self) -> int:
+        return int(self.hashes.size)
+
+
+def dict_nbytes(mapping: dict) -> int:
+    """Taille approximative (octets) d'un dict et de ses clés / valeurs."""
+    return sys.getsizeof(mapping) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in mapping.items())